@@ -14,7 +14,8 @@ from database import SQLALCHEMY_DATABASE_URL
 
 config = context.config
 
-if config.config_file_name is not None:
+# Not when run in-process by migrations.ensure_schema (keeps the app's loggers)
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
     fileConfig(config.config_file_name)
 
 target_metadata = models.Base.metadata
@@ -59,6 +60,14 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
+    # migrations.ensure_schema passes its own (locked) connection
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
     connectable = engine_from_config(
         config.get_section(config.config_ini_section, {}),
         prefix="sqlalchemy.",
@@ -0,0 +1,54 @@
+"""updated_at columns and tombstones for delta sync
+
+Revision ID: a3c81f6d2e94
+Revises: f18d3b5e7a26
+Create Date: 2026-10-17 15:02:11.408215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migration_helpers import (
+    add_column_if_missing, create_index_if_missing, drop_column_if_present, drop_index_if_present, has_table
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c81f6d2e94'
+down_revision: Union[str, Sequence[str], None] = 'f18d3b5e7a26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SYNCED_TABLES = ('atividades', 'estrategia', 'insights', 'categorias_v2', 'acoes_v2')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in SYNCED_TABLES:
+        add_column_if_missing(table, sa.Column('updated_at', sa.DateTime(), nullable=True))
+        create_index_if_missing(f'ix_{table}_user_id_updated_at', table, ['user_id', 'updated_at'])
+    add_column_if_missing('plan_shares', sa.Column('created_at', sa.DateTime(), nullable=True))
+
+    if not has_table('sync_tombstones'):
+        op.create_table('sync_tombstones',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('entity', sa.String(), nullable=True),
+        sa.Column('entity_id', sa.String(), nullable=True),
+        sa.Column('deleted_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+    create_index_if_missing('ix_sync_tombstones_user_id_deleted_at', 'sync_tombstones', ['user_id', 'deleted_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_if_present('ix_sync_tombstones_user_id_deleted_at', 'sync_tombstones')
+    if has_table('sync_tombstones'):
+        op.drop_table('sync_tombstones')
+    drop_column_if_present('plan_shares', 'created_at')
+    for table in SYNCED_TABLES:
+        drop_index_if_present(f'ix_{table}_user_id_updated_at', table)
+        drop_column_if_present(table, 'updated_at')
@@ -0,0 +1,35 @@
+"""Composite indexes for hot query shapes
+
+Revision ID: b3e91c07d2a4
+Revises: 5722af84c0f6
+Create Date: 2026-10-17 09:12:41.508113
+
+"""
+from typing import Sequence, Union
+
+from migration_helpers import create_index_if_missing, drop_index_if_present
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e91c07d2a4'
+down_revision: Union[str, Sequence[str], None] = '5722af84c0f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    create_index_if_missing('ix_atividades_user_id_data_status', 'atividades', ['user_id', 'data', 'status'])
+    create_index_if_missing('ix_atividades_user_id_id', 'atividades', ['user_id', 'id'])
+    create_index_if_missing('ix_insights_user_id_id', 'insights', ['user_id', 'id'])
+    create_index_if_missing('ix_plan_shares_shared_with_email', 'plan_shares', ['shared_with_email'])
+    create_index_if_missing('ix_estrategia_user_id_semana_inicio', 'estrategia', ['user_id', 'semana_inicio'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_if_present('ix_estrategia_user_id_semana_inicio', 'estrategia')
+    drop_index_if_present('ix_plan_shares_shared_with_email', 'plan_shares')
+    drop_index_if_present('ix_insights_user_id_id', 'insights')
+    drop_index_if_present('ix_atividades_user_id_id', 'atividades')
+    drop_index_if_present('ix_atividades_user_id_data_status', 'atividades')
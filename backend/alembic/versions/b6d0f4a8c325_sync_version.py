@@ -0,0 +1,45 @@
+"""sync_version columns for commit-ordered delta sync
+
+Revision ID: b6d0f4a8c325
+Revises: f4b8d2e6a913
+Create Date: 2026-10-17 21:40:27.118064
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migration_helpers import add_column_if_missing, create_index_if_missing, drop_column_if_present, drop_index_if_present
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6d0f4a8c325'
+down_revision: Union[str, Sequence[str], None] = 'f4b8d2e6a913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SYNCED_TABLES = ('atividades', 'estrategia', 'insights', 'categorias_v2', 'acoes_v2')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # No server default: rows written without a stamp must stay NULL until
+    # the commit stamps them. Existing rows predate every sync token.
+    for table in (*SYNCED_TABLES, 'sync_tombstones'):
+        add_column_if_missing(table, sa.Column('sync_version', sa.Integer(), nullable=True))
+        op.execute(f"UPDATE {table} SET sync_version = 0 WHERE sync_version IS NULL")
+        create_index_if_missing(f'ix_{table}_user_id_sync_version', table, ['user_id', 'sync_version'])
+    for table in SYNCED_TABLES:
+        drop_index_if_present(f'ix_{table}_user_id_updated_at', table)
+    drop_index_if_present('ix_sync_tombstones_user_id_deleted_at', 'sync_tombstones')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    create_index_if_missing('ix_sync_tombstones_user_id_deleted_at', 'sync_tombstones', ['user_id', 'deleted_at'])
+    for table in SYNCED_TABLES:
+        create_index_if_missing(f'ix_{table}_user_id_updated_at', table, ['user_id', 'updated_at'])
+    for table in (*SYNCED_TABLES, 'sync_tombstones'):
+        drop_index_if_present(f'ix_{table}_user_id_sync_version', table)
+        drop_column_if_present(table, 'sync_version')
@@ -0,0 +1,29 @@
+"""users.data_version for list ETags
+
+Revision ID: b8d4f2a61c37
+Revises: a3c81f6d2e94
+Create Date: 2026-10-17 16:10:42.551903
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from migration_helpers import add_column_if_missing, drop_column_if_present
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d4f2a61c37'
+down_revision: Union[str, Sequence[str], None] = 'a3c81f6d2e94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    add_column_if_missing('users', sa.Column('data_version', sa.Integer(), nullable=True, server_default='0'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_column_if_present('users', 'data_version')
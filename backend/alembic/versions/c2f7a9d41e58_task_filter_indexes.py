@@ -0,0 +1,29 @@
+"""Indexes for the /tasks column filters
+
+Revision ID: c2f7a9d41e58
+Revises: b8d4f2a61c37
+Create Date: 2026-10-17 18:40:12.204519
+
+"""
+from typing import Sequence, Union
+
+from migration_helpers import create_index_if_missing, drop_index_if_present
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2f7a9d41e58'
+down_revision: Union[str, Sequence[str], None] = 'b8d4f2a61c37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    create_index_if_missing('ix_atividades_user_id_categoria_data', 'atividades', ['user_id', 'categoria', 'data'])
+    create_index_if_missing('ix_atividades_user_id_prioridade_data', 'atividades', ['user_id', 'prioridade', 'data'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_if_present('ix_atividades_user_id_prioridade_data', 'atividades')
+    drop_index_if_present('ix_atividades_user_id_categoria_data', 'atividades')
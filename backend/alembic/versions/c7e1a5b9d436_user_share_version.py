@@ -0,0 +1,29 @@
+"""users.share_version for the shared owners cache
+
+Revision ID: c7e1a5b9d436
+Revises: b6d0f4a8c325
+Create Date: 2026-10-17 22:14:50.662391
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from migration_helpers import add_column_if_missing, drop_column_if_present
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e1a5b9d436'
+down_revision: Union[str, Sequence[str], None] = 'b6d0f4a8c325'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    add_column_if_missing('users', sa.Column('share_version', sa.Integer(), nullable=True, server_default='0'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_column_if_present('users', 'share_version')
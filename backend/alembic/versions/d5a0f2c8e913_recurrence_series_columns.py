@@ -0,0 +1,42 @@
+"""Store recurring tasks as one series row plus exception rows
+
+Revision ID: d5a0f2c8e913
+Revises: b3e91c07d2a4
+Create Date: 2026-10-17 10:41:07.226390
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from migration_helpers import (
+    add_column_if_missing,
+    create_index_if_missing,
+    drop_column_if_present,
+    drop_index_if_present,
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5a0f2c8e913'
+down_revision: Union[str, Sequence[str], None] = 'b3e91c07d2a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    add_column_if_missing('atividades', sa.Column('recorrente', sa.Boolean(), nullable=True))
+    add_column_if_missing('atividades', sa.Column('serie_id', sa.Integer(), nullable=True))
+    add_column_if_missing('atividades', sa.Column('serie_data', sa.Date(), nullable=True))
+    add_column_if_missing('atividades', sa.Column('excluida', sa.Boolean(), nullable=True))
+    create_index_if_missing('ix_atividades_serie_id', 'atividades', ['serie_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_if_present('ix_atividades_serie_id', 'atividades')
+    drop_column_if_present('atividades', 'excluida')
+    drop_column_if_present('atividades', 'serie_data')
+    drop_column_if_present('atividades', 'serie_id')
+    drop_column_if_present('atividades', 'recorrente')
@@ -0,0 +1,29 @@
+"""atividades.copia: explicit copies skip the duplicate check
+
+Revision ID: d8f2b6c0e547
+Revises: c7e1a5b9d436
+Create Date: 2026-10-17 22:48:09.215734
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from migration_helpers import add_column_if_missing, drop_column_if_present
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8f2b6c0e547'
+down_revision: Union[str, Sequence[str], None] = 'c7e1a5b9d436'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    add_column_if_missing('atividades', sa.Column('copia', sa.Boolean(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_column_if_present('atividades', 'copia')
@@ -0,0 +1,47 @@
+"""Columns previously added by apply_migrations() on every boot
+
+Revision ID: d9e4b1c7a2f3
+Revises: c2f7a9d41e58
+Create Date: 2026-10-17 19:05:27.913406
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from migration_helpers import add_column_if_missing
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9e4b1c7a2f3'
+down_revision: Union[str, Sequence[str], None] = 'c2f7a9d41e58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ATIVIDADES_COLUMNS = {
+    'recorrencia_tipo': sa.String(),
+    'recorrencia_intervalo': sa.Integer(),
+    'recorrencia_dia_mes': sa.Integer(),
+    'recorrencia_dias_semana': sa.String(),
+    'recorrencia_inicio': sa.Date(),
+    'recorrencia_fim': sa.Date(),
+    'acao': sa.String(),
+}
+INSIGHTS_COLUMNS = (
+    'o_que', 'como', 'onde', 'cta', 'duracao', 'kpi_meta', 'tipo_dia',
+    'dia_semana', 'tema_macro', 'angulo', 'canal_area', 'prioridade',
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, type_ in ATIVIDADES_COLUMNS.items():
+        add_column_if_missing('atividades', sa.Column(name, type_, nullable=True))
+    for name in INSIGHTS_COLUMNS:
+        add_column_if_missing('insights', sa.Column(name, sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Most databases had these columns long before this revision; keep them
+    pass
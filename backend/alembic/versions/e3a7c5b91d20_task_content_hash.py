@@ -0,0 +1,66 @@
+"""Content hash of single tasks for duplicate detection
+
+Revision ID: e3a7c5b91d20
+Revises: d9e4b1c7a2f3
+Create Date: 2026-10-17 20:12:48.530172
+
+"""
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migration_helpers import (
+    add_column_if_missing, create_index_if_missing, drop_column_if_present, drop_index_if_present
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3a7c5b91d20'
+down_revision: Union[str, Sequence[str], None] = 'd9e4b1c7a2f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CHUNK_SIZE = 1000
+
+
+def task_content_hash(descricao, categoria, prioridade):
+    # Frozen copy of models.task_content_hash as of this revision
+    values = [descricao or '', categoria or '', prioridade or '']
+    return hashlib.sha1("\x1f".join(values).encode("utf-8")).hexdigest()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    add_column_if_missing('atividades', sa.Column('content_hash', sa.String(), nullable=True))
+    create_index_if_missing('ix_atividades_user_id_data_content_hash', 'atividades', ['user_id', 'data', 'content_hash'])
+
+    # Backfill the single tasks (series and exception rows keep NULL)
+    atividades = sa.table(
+        'atividades', sa.column('id'), sa.column('descricao'), sa.column('categoria'), sa.column('prioridade'),
+        sa.column('recorrente'), sa.column('serie_id'), sa.column('content_hash'),
+    )
+    bind = op.get_bind()
+    stmt = atividades.update().where(atividades.c.id == sa.bindparam('_id')).values(content_hash=sa.bindparam('_hash'))
+    last_id = 0
+    while True:
+        # Keyset chunks by id: only CHUNK_SIZE rows in memory at a time
+        rows = bind.execute(
+            sa.select(atividades.c.id, atividades.c.descricao, atividades.c.categoria, atividades.c.prioridade).where(
+                atividades.c.id > last_id,
+                atividades.c.content_hash.is_(None),
+                atividades.c.recorrente.isnot(True),
+                atividades.c.serie_id.is_(None),
+            ).order_by(atividades.c.id).limit(CHUNK_SIZE)
+        ).all()
+        if not rows:
+            break
+        bind.execute(stmt, [{'_id': r.id, '_hash': task_content_hash(r.descricao, r.categoria, r.prioridade)} for r in rows])
+        last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_if_present('ix_atividades_user_id_data_content_hash', 'atividades')
+    drop_column_if_present('atividades', 'content_hash')
@@ -0,0 +1,33 @@
+"""Natural key and content hash for diff-based re-imports
+
+Revision ID: f18d3b5e7a26
+Revises: e7c24a9b6f15
+Create Date: 2026-10-17 13:20:54.117630
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from migration_helpers import add_column_if_missing, drop_column_if_present
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f18d3b5e7a26'
+down_revision: Union[str, Sequence[str], None] = 'e7c24a9b6f15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ('atividades', 'estrategia'):
+        add_column_if_missing(table, sa.Column('import_key', sa.String(), nullable=True))
+        add_column_if_missing(table, sa.Column('import_hash', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('atividades', 'estrategia'):
+        drop_column_if_present(table, 'import_hash')
+        drop_column_if_present(table, 'import_key')
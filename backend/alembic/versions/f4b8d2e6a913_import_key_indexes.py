@@ -0,0 +1,34 @@
+"""Indexes on the import natural key; task keys recomputed on the next import
+
+Revision ID: f4b8d2e6a913
+Revises: e3a7c5b91d20
+Create Date: 2026-10-17 21:30:05.118264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from migration_helpers import create_index_if_missing, drop_index_if_present
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4b8d2e6a913'
+down_revision: Union[str, Sequence[str], None] = 'e3a7c5b91d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    create_index_if_missing('ix_atividades_user_id_import_key', 'atividades', ['user_id', 'import_key'])
+    create_index_if_missing('ix_estrategia_user_id_import_key', 'estrategia', ['user_id', 'import_key'])
+    # The task key changed to (data, descricao, categoria): clear the old keys
+    # so the next import adopts these rows again under the new ones
+    op.execute("UPDATE atividades SET import_key = NULL, import_hash = NULL WHERE import_key IS NOT NULL")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_if_present('ix_estrategia_user_id_import_key', 'estrategia')
+    drop_index_if_present('ix_atividades_user_id_import_key', 'atividades')
@@ -0,0 +1,111 @@
+"""
+Async versions of the hot endpoints, mounted by main.py when ASYNC_DB=1.
+
+They build the same statements as the sync handlers (see queries.py) but run
+them on an AsyncSession, so a slow query no longer holds one of Starlette's
+threadpool slots. Password hashing is CPU bound and runs in the process pool
+of passwords.py.
+"""
+from datetime import date, timedelta
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import auth
+import etags
+import models
+import passwords
+import queries
+import recurrence
+import schemas
+import shares
+from database import get_async_db
+
+router = APIRouter()
+
+
+@router.post("/auth/token")
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(queries.user_by_email(form_data.username))
+    user = result.scalars().first()
+    hashed_password = user.hashed_password if user else None
+    await db.rollback() # don't hold a pool connection while the hash is checked
+    verified, new_hash = await passwords.verify_and_update_async(form_data.password, hashed_password) if user else (False, None)
+    if not verified:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+
+    access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = auth.create_access_token(
+        data={"sub": form_data.username}, expires_delta=access_token_expires
+    )
+    return {"access_token": access_token, "token_type": "bearer"}
+
+
+@router.get("/auth/me")
+async def read_users_me(current_user: models.User = Depends(auth.get_current_user_async)):
+    return {"id": current_user.id, "email": current_user.email, "role": current_user.role}
+
+
+@router.get("/tasks", response_model=List[schemas.TaskOut])
+async def read_tasks(
+    request: Request,
+    response: Response,
+    limit: int = Query(1000, ge=1, le=queries.MAX_PAGE_SIZE),
+    after_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    fields: Optional[str] = None,
+    owner: Optional[str] = Query(None, pattern="^(own|shared)$"),
+    filters: dict = Depends(queries.task_filters),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(auth.get_current_user_async)
+):
+    names = queries.parse_fields(fields, schemas.TaskOut)
+    cached = await etags.not_modified_async(db, request, response, current_user, shared=True)
+    if cached is not None:
+        return cached
+    shared_owners = await shares.shared_owner_ids_async(db, current_user)
+    stmt = queries.task_page(
+        current_user, shared_owners, queries.resolve_cursor(cursor, after_id), limit, date_from, date_to, names, filters, owner
+    )
+    tasks = queries.trim_page((await db.execute(stmt)).all(), limit, response)
+    return schemas.render(schemas.plain(await recurrence.expand_rows_async(db, tasks, date_from, date_to), names), response)
+
+
+@router.get("/insights", response_model=List[schemas.InsightOut])
+async def read_insights(
+    request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1, le=queries.MAX_PAGE_SIZE),
+    after_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(auth.get_current_user_async)
+):
+    names = queries.parse_fields(fields, schemas.InsightOut)
+    cached = await etags.not_modified_async(db, request, response, current_user)
+    if cached is not None:
+        return cached
+    stmt = queries.keyset(queries.insights(current_user, names), models.Insight.id, queries.resolve_cursor(cursor, after_id), limit)
+    return schemas.render(schemas.plain(queries.trim_page((await db.execute(stmt)).all(), limit, response)), response)
+
+
+@router.get("/briefing/today", response_model=schemas.BriefingOut)
+async def get_today_briefing(db: AsyncSession = Depends(get_async_db), current_user: models.User = Depends(auth.get_current_user_async)):
+    """Get today's tasks for briefing popup"""
+    today = date.today()
+    tasks = list((await db.execute(queries.briefing_tasks(current_user.id, today))).all())
+    series = (await db.execute(queries.briefing_series(current_user.id, today))).all()
+    tasks.extend(await recurrence.expand_rows_async(db, series, today, today))
+    return schemas.render(queries.briefing(today, tasks))
@@ -1,27 +1,55 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
+import os
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import models
-from database import get_db
+import passwords
+from cache import TTLCache
+from database import get_db, get_async_db
 
 # CONSTANTS - In Prod these should be Env Vars
 SECRET_KEY = "mysecretkey_changeme_in_prod" # TODO: Change for Prod
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7 # 1 week
 
-# Use pbkdf2_sha256 which is robust and pure python compatible if needed
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
+# Per-worker cache of authenticated users, keyed by token subject (email).
+# A hit costs no query: the worker making a role/email/password change or a
+# delete drops its entry right away, other workers serve the old entry for
+# at most USER_CACHE_TTL_SECONDS. Set USER_CACHE_TTL_SECONDS=0 to disable it.
+user_cache = TTLCache(
+    maxsize=int(os.getenv("USER_CACHE_MAX_SIZE", "1024")),
+    ttl=float(os.getenv("USER_CACHE_TTL_SECONDS", "60")),
+)
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """Detached snapshot of the columns endpoints read from the current user"""
+    id: int
+    email: str
+    role: str
+    share_version: int = 0
+
+def invalidate_user(*emails):
+    """Drop cached entries after a user's role, email or password changes"""
+    for email in emails:
+        if email:
+            user_cache.invalidate(email)
+
+# Hashing (pbkdf2_sha256, cost from PASSWORD_HASH_ROUNDS) lives in passwords.py
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return passwords.verify_and_update(plain_password, hashed_password)[0]
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return passwords.hash_password(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -33,21 +61,45 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+def credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def token_subject(token: str) -> str:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
-            raise credentials_exception
+            raise credentials_exception()
     except JWTError:
-        raise credentials_exception
-        
-    user = db.query(models.User).filter(models.User.email == email).first()
+        raise credentials_exception()
+    return email
+
+def cache_user(user):
     if user is None:
-        raise credentials_exception
-    return user
+        raise credentials_exception()
+    current = CurrentUser(id=user.id, email=user.email, role=user.role, share_version=user.share_version or 0)
+    user_cache.set(user.email, current)
+    return current
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    email = token_subject(token)
+    cached = user_cache.get(email)
+    if cached is not None:
+        return cached
+    # Off the event loop: waiting for a pool connection here would block the
+    # loop that the requests holding connections need in order to return them
+    user = await run_in_threadpool(db.query(models.User).filter(models.User.email == email).first)
+    return cache_user(user)
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    """get_current_user for the async endpoints (ASYNC_DB=1)"""
+    email = token_subject(token)
+    cached = user_cache.get(email)
+    if cached is not None:
+        return cached
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    return cache_user(result.scalars().first())
@@ -0,0 +1,128 @@
+"""
+Load benchmark: sync (threadpool) endpoints vs the ASYNC_DB=1 async stack.
+
+Seeds a throwaway SQLite database (or uses DATABASE_URL), starts the API
+with uvicorn once per mode and hits /tasks, /insights, /briefing/today and
+/auth/me with concurrent clients for a fixed time.
+
+    pip install httpx
+    python bench_async.py [--concurrency 100] [--seconds 10]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import httpx
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PORT = 8765
+ENDPOINTS = ["/tasks?limit=100", "/insights", "/briefing/today", "/auth/me"]
+EMAIL, PASSWORD = "bench@example.com", "bench"
+
+
+def seed(database_url, tasks=5000, insights=500):
+    os.environ["DATABASE_URL"] = database_url
+    from database import SessionLocal, engine
+    import auth
+    import models
+
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if db.query(models.User).filter(models.User.email == EMAIL).first():
+            return
+        user = models.User(email=EMAIL, hashed_password=auth.get_password_hash(PASSWORD))
+        db.add(user)
+        db.flush()
+        today = date.today()
+        db.add_all(
+            models.Atividade(user_id=user.id, descricao=f"Task {i}", data=today + timedelta(days=i % 60 - 30),
+                             status="A fazer", prioridade="Média", categoria="Geral")
+            for i in range(tasks)
+        )
+        db.add_all(
+            models.Insight(user_id=user.id, descricao=f"Insight {i}", categoria="Geral", status="Ideia")
+            for i in range(insights)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+async def wait_ready(client):
+    for _ in range(300):
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+async def worker(client, headers, deadline, latencies, errors, offset):
+    i = offset
+    while time.perf_counter() < deadline:
+        path = ENDPOINTS[i % len(ENDPOINTS)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            r = await client.get(path, headers=headers)
+            ok = r.status_code == 200
+        except httpx.TransportError:
+            ok = False
+        latencies.append((time.perf_counter() - start) * 1000)
+        errors[0] += 0 if ok else 1
+
+
+async def load(concurrency, seconds):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", limits=limits, timeout=60) as client:
+        await wait_ready(client)
+        r = await client.post("/auth/token", data={"username": EMAIL, "password": PASSWORD})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        latencies, errors = [], [0]
+        deadline = time.perf_counter() + seconds
+        await asyncio.gather(*(worker(client, headers, deadline, latencies, errors, n) for n in range(concurrency)))
+    return latencies, errors[0]
+
+
+def run_mode(name, env, concurrency, seconds):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(PORT), "--log-level", "warning"],
+        cwd=BASE_DIR, env=env,
+    )
+    try:
+        latencies, errors = asyncio.run(load(concurrency, seconds))
+    finally:
+        server.terminate()
+        server.wait()
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+    print(f"{name:<6} {len(latencies) / seconds:>9.1f} {statistics.median(latencies):>9.1f}ms {p95:>9.1f}ms {errors:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL") or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_async.db")
+    seed(database_url)
+
+    print(f"{args.concurrency} concurrent clients, {args.seconds:.0f}s per mode, endpoints: {', '.join(ENDPOINTS)}")
+    print(f"{'mode':<6} {'req/s':>9} {'p50':>11} {'p95':>11} {'errors':>7}")
+    for name, flag in (("sync", "0"), ("async", "1")):
+        env = dict(os.environ, DATABASE_URL=database_url, ASYNC_DB=flag, USER_CACHE_TTL_SECONDS="0")
+        run_mode(name, env, args.concurrency, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Load benchmark: login throughput with password hashing inline vs in the
+process pool (PASSWORD_HASH_WORKERS).
+
+Starts the API with uvicorn once per mode against a throwaway SQLite
+database (or DATABASE_URL). Concurrent clients post to /auth/token while
+others poll /auth/me, which shows how much a login burst stalls the
+requests that don't hash anything.
+
+    pip install httpx
+    python bench_login.py [--logins 20] [--readers 20] [--seconds 10]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PORT = 8766
+EMAIL, PASSWORD = "bench-login@example.com", "bench"
+MODES = (("inline", "0"), ("pool", str(min(2, os.cpu_count() or 1))))
+
+
+async def wait_ready(client):
+    for _ in range(300):
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+async def loop(client, deadline, latencies, errors, request):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            ok = (await request(client)).status_code == 200
+        except httpx.TransportError:
+            ok = False
+        latencies.append((time.perf_counter() - start) * 1000)
+        errors[0] += 0 if ok else 1
+
+
+async def load(logins, readers, seconds):
+    limits = httpx.Limits(max_connections=logins + readers)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", limits=limits, timeout=120) as client:
+        await wait_ready(client)
+        r = await client.post("/auth/register", json={"email": EMAIL, "password": PASSWORD})
+        if r.status_code != 200:
+            r = await client.post("/auth/token", data={"username": EMAIL, "password": PASSWORD})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        def login(c):
+            return c.post("/auth/token", data={"username": EMAIL, "password": PASSWORD})
+
+        def me(c):
+            return c.get("/auth/me", headers=headers)
+
+        login_ms, read_ms, errors = [], [], [0]
+        deadline = time.perf_counter() + seconds
+        await asyncio.gather(
+            *(loop(client, deadline, login_ms, errors, login) for _ in range(logins)),
+            *(loop(client, deadline, read_ms, errors, me) for _ in range(readers)),
+        )
+    return login_ms, read_ms, errors[0]
+
+
+def p95(values):
+    values = sorted(values)
+    return values[int(len(values) * 0.95) - 1] if values else 0
+
+
+def run_mode(name, env, args):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(PORT), "--log-level", "warning"],
+        cwd=BASE_DIR, env=env,
+    )
+    try:
+        login_ms, read_ms, errors = asyncio.run(load(args.logins, args.readers, args.seconds))
+    finally:
+        server.terminate()
+        server.wait()
+    print(
+        f"{name:<7} {len(login_ms) / args.seconds:>9.1f} {statistics.median(login_ms):>9.1f}ms "
+        f"{statistics.median(read_ms):>11.1f}ms {p95(read_ms):>11.1f}ms {errors:>7}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logins", type=int, default=20, help="concurrent login clients")
+    parser.add_argument("--readers", type=int, default=20, help="concurrent /auth/me clients")
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL") or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_login.db")
+    print(f"{args.logins} login + {args.readers} /auth/me clients, {args.seconds:.0f}s per mode, {os.cpu_count()} CPUs")
+    print(f"{'mode':<7} {'logins/s':>9} {'login p50':>11} {'/me p50':>13} {'/me p95':>13} {'errors':>7}")
+    for name, workers in MODES:
+        env = dict(os.environ, DATABASE_URL=database_url, PASSWORD_HASH_WORKERS=workers)
+        run_mode(name, env, args)
+
+
+if __name__ == "__main__":
+    main()
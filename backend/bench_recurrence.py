@@ -0,0 +1,104 @@
+"""
+Benchmark: creating and expanding multi-year recurring series.
+
+Compares the old create_task path (day-by-day loop, one ORM row per
+occurrence, add_all) with the current one (single series row, occurrences
+computed with pandas date ranges on read). Runs against a throwaway SQLite
+database unless DATABASE_URL is set.
+
+    python bench_recurrence.py
+"""
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+if not os.getenv("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_recurrence.db")
+
+from database import SessionLocal, engine
+import models
+import recurrence
+
+models.Base.metadata.create_all(bind=engine)
+
+YEARS = 5
+START = date(2026, 1, 1)
+END = START + timedelta(days=365 * YEARS)
+
+RULES = {
+    "daily (n_dias=1)": dict(recorrencia_tipo="n_dias", recorrencia_intervalo=1),
+    "every 3 days": dict(recorrencia_tipo="n_dias", recorrencia_intervalo=3),
+    "mon/wed/fri": dict(recorrencia_tipo="dia_semana", recorrencia_dias_semana="0,2,4"),
+    "day 15 monthly": dict(recorrencia_tipo="dia_mes", recorrencia_dia_mes=15),
+}
+
+
+def task_data(rule):
+    data = dict(
+        descricao="Bench series", status="A fazer", prioridade="Média", categoria="Geral",
+        como="", onde="", cta="", duracao="", kpi_meta="", tipo_dia="", dia_semana="",
+        tema_macro="", angulo="", canal_area="", o_que="", acao="",
+        recorrencia_intervalo=None, recorrencia_dia_mes=None, recorrencia_dias_semana=None,
+        recorrencia_inicio=START, recorrencia_fim=END,
+    )
+    data.update(rule)
+    return data
+
+
+def legacy_create(db, data):
+    """The previous create_task recurrence branch, kept here for comparison"""
+    current_date, tasks_to_create = START, []
+    while current_date <= END:
+        should_create = False
+        if data["recorrencia_tipo"] == 'n_dias' and data["recorrencia_intervalo"]:
+            if (current_date - START).days % data["recorrencia_intervalo"] == 0:
+                should_create = True
+        elif data["recorrencia_tipo"] == 'dia_mes' and data["recorrencia_dia_mes"]:
+            if current_date.day == data["recorrencia_dia_mes"]:
+                should_create = True
+        elif data["recorrencia_tipo"] == 'dia_semana' and data["recorrencia_dias_semana"]:
+            allowed_days = [int(d) for d in data["recorrencia_dias_semana"].split(',') if d.strip()]
+            if current_date.weekday() in allowed_days:
+                should_create = True
+        if should_create:
+            tasks_to_create.append(models.Atividade(**dict(data, data=current_date)))
+        current_date += timedelta(days=1)
+    db.add_all(tasks_to_create)
+    db.commit()
+    return len(tasks_to_create)
+
+
+def series_create(db, data):
+    """Current create_task: validate the rule, store one series row"""
+    serie = models.Atividade(**dict(data, data=START), recorrente=True)
+    count = len(recurrence.occurrence_dates(serie))
+    db.add(serie)
+    db.commit()
+    return serie, count
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def run_benchmark():
+    db = SessionLocal()
+    try:
+        print(f"{YEARS}-year series ({START} .. {END})")
+        print(f"{'rule':<18} {'occurrences':>11} {'legacy create':>14} {'series create':>14} {'expand all':>11} {'expand month':>13}")
+        for name, rule in RULES.items():
+            data = task_data(rule)
+            _, legacy_ms = timed(legacy_create, db, data)
+            (serie, count), create_ms = timed(series_create, db, data)
+            _, expand_ms = timed(recurrence.expand_rows, db, [serie])
+            _, month_ms = timed(recurrence.expand_rows, db, [serie], date(2028, 3, 1), date(2028, 3, 31))
+            print(f"{name:<18} {count:>11} {legacy_ms:>12.1f}ms {create_ms:>12.1f}ms {expand_ms:>9.1f}ms {month_ms:>11.1f}ms")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,100 @@
+"""
+Benchmark: building the /tasks response body at 1k and 10k rows.
+
+Compares the previous path (ORM objects, jsonable_encoder, json.dumps) with
+the current one (Core rows with the TaskOut columns, straight to orjson),
+then times GET /tasks end to end in pages of MAX_PAGE_SIZE. Runs against a
+throwaway SQLite database unless DATABASE_URL is set.
+
+    python bench_serialization.py
+"""
+import json
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+if not os.getenv("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_serialization.db")
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+
+from database import SessionLocal
+import main
+import models
+import queries
+import schemas
+
+SIZES = (1000, 10000)
+REPEAT = 5
+
+
+def seed(db, user_id, count):
+    today = date.today()
+    db.add_all(
+        models.Atividade(
+            user_id=user_id, descricao=f"Bench task {i}", data=today + timedelta(days=i % 365),
+            status="A fazer", prioridade="Média", categoria="Geral", o_que="Post", como="Instagram",
+            onde="Online", cta="Link na bio", duracao="30 min", kpi_meta="100 likes", tipo_dia="Útil",
+            dia_semana="Segunda", tema_macro="Marca", angulo="Educativo", canal_area="Social", acao="Publicar",
+            descricao_original=f"Descrição original {i}"
+        )
+        for i in range(count)
+    )
+    db.commit()
+
+
+def legacy_body(db, user):
+    """The previous /tasks: ORM entities through jsonable_encoder and json"""
+    rows = db.query(models.Atividade).filter(models.Atividade.user_id == user.id).order_by(models.Atividade.id.desc()).all()
+    return json.dumps(jsonable_encoder(rows)).encode("utf-8")
+
+
+def current_body(db, user):
+    rows = db.execute(queries.tasks(user, ()).order_by(models.Atividade.id.desc())).all()
+    return orjson.dumps(schemas.plain(rows))
+
+
+def best_ms(fn, *args):
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def fetch_all_pages(client, headers):
+    cursor, total = "", 0
+    while True:
+        r = client.get(f"/tasks?limit={queries.MAX_PAGE_SIZE}&cursor={cursor}", headers=headers)
+        total += len(r.content)
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            return total
+
+
+def run_benchmark():
+    client = TestClient(main.app)
+    print(f"{'rows':>6} {'legacy body':>12} {'current body':>13} {'speedup':>8} {'GET /tasks (all pages)':>23}")
+    for size in SIZES:
+        email = f"bench{size}@example.com"
+        token = client.post("/auth/register", json={"email": email, "password": "bench"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        db = SessionLocal()
+        try:
+            user = db.query(models.User).filter(models.User.email == email).first()
+            seed(db, user.id, size)
+            current = main.auth.CurrentUser(id=user.id, email=user.email, role=user.role)
+            legacy_ms = best_ms(legacy_body, db, user)
+            current_ms = best_ms(current_body, db, current)
+        finally:
+            db.close()
+        endpoint_ms = best_ms(fetch_all_pages, client, headers)
+        print(f"{size:>6} {legacy_ms:>10.1f}ms {current_ms:>11.1f}ms {legacy_ms / current_ms:>7.1f}x {endpoint_ms:>21.1f}ms")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -1,7 +1,10 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 import os
+import pool_metrics
 
 # Define Base first to avoid circular imports if models imports this
 Base = declarative_base()
@@ -22,9 +25,24 @@ else:
         SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("postgres://", "postgresql://", 1)
     connect_args = {}
 
+# Connection pool, per worker process. Every gunicorn worker (WEB_CONCURRENCY)
+# opens up to DB_POOL_SIZE + DB_MAX_OVERFLOW connections, so keep
+# workers * (size + overflow) under the database's connection limit.
+# pre-ping and recycle drop connections the server closed while idle.
+POOL_SETTINGS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "5")),
+    "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1").lower() in ("1", "true", "yes"),
+}
+
+pool_stats = pool_metrics.PoolStats()
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args=connect_args
+    SQLALCHEMY_DATABASE_URL, connect_args=connect_args,
+    poolclass=pool_metrics.instrumented_pool(QueuePool, pool_stats), **POOL_SETTINGS
 )
+pool_metrics.listen(engine, pool_stats)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db():
@@ -33,3 +51,46 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Opt-in async stack (ASYNC_DB=1): the hot read endpoints and auth then run on
+# the event loop with asyncpg (Postgres) or aiosqlite (SQLite) instead of
+# taking a threadpool slot each. The sync engine above is still used by every
+# other endpoint, the importer and the CLI scripts.
+ASYNC_DB_ENABLED = os.getenv("ASYNC_DB", "0").lower() in ("1", "true", "yes")
+
+def async_database_url(url):
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    if url.startswith("sqlite:///"):
+        return url.replace("sqlite:///", "sqlite+aiosqlite:///", 1)
+    return url
+
+async_engine = None
+async_pool_stats = None
+AsyncSessionLocal = None
+if ASYNC_DB_ENABLED:
+    async_pool_stats = pool_metrics.PoolStats()
+    async_engine = create_async_engine(
+        async_database_url(SQLALCHEMY_DATABASE_URL),
+        poolclass=pool_metrics.instrumented_pool(AsyncAdaptedQueuePool, async_pool_stats), **POOL_SETTINGS
+    )
+    pool_metrics.listen(async_engine.sync_engine, async_pool_stats)
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def pool_status():
+    status = {
+        "workers": int(os.getenv("WEB_CONCURRENCY", "1")),
+        "settings": POOL_SETTINGS,
+        "sync": pool_metrics.pool_status(engine, pool_stats),
+    }
+    if async_engine is not None:
+        status["async"] = pool_metrics.pool_status(async_engine.sync_engine, async_pool_stats)
+    engines = 2 if async_engine is not None else 1
+    status["max_connections_all_workers"] = (
+        status["workers"] * engines * (POOL_SETTINGS["pool_size"] + POOL_SETTINGS["max_overflow"])
+    )
+    return status
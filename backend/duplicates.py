@@ -0,0 +1,116 @@
+"""
+Duplicate tasks: single tasks of the same user on the same day with the same
+content_hash (descricao, categoria, prioridade; see models.task_content_hash).
+
+The hash is set on every ORM insert/update and indexed with (user_id, data),
+so POST /tasks and the spreadsheet import check for an existing copy with one
+index lookup. Rows that predate the check are removed by POST
+/admin/tasks/dedup (or remove_duplicates.py): a ROW_NUMBER() window over that
+key keeps the oldest row of each group and the rest are deleted in SQL.
+
+Copies made with POST /tasks/{id}/duplicate are flagged (copia) and get no
+hash, so neither the check nor the dedup touches them. Editing a copy's
+descricao, categoria or prioridade clears the flag and the row is hashed like
+any other task.
+"""
+from collections import Counter
+
+from sqlalchemy import String, bindparam, case, cast, delete, exists, func, insert, literal, or_, select, update
+from sqlalchemy.orm import Session, aliased
+
+import etags
+import models
+import recurrence
+import sync
+
+
+def existing(user_id: int, day, content_hash: str):
+    """Id of a visible task the user already has with this content that day"""
+    Atividade = models.Atividade
+    return select(Atividade.id).where(
+        Atividade.user_id == user_id,
+        Atividade.data == day,
+        Atividade.content_hash == content_hash,
+        recurrence.is_visible(),
+    ).limit(1)
+
+
+def existing_in(user_id: int, rows):
+    """existing() for every row of `rows` (atividades or an alias of it), as a
+    correlated EXISTS for set-based statements"""
+    Mine = aliased(models.Atividade)
+    return exists().where(
+        Mine.user_id == user_id,
+        Mine.data == rows.c.data,
+        Mine.content_hash == rows.c.content_hash,
+        Mine.excluida.isnot(True),
+    )
+
+
+def copia_after(values):
+    """copia for a Core UPDATE setting `values`: cleared where a content column changes"""
+    Atividade = models.Atividade
+    changed = [getattr(Atividade, c).is_distinct_from(values[c]) for c in models.CONTENT_COLUMNS if c in values]
+    if not changed:
+        return Atividade.copia
+    return case((or_(*changed), False), else_=Atividade.copia)
+
+
+def refresh_content_hashes(db: Session, ids):
+    """Recompute the hash of rows changed with a Core UPDATE (which skips the ORM event)"""
+    Atividade = models.Atividade
+    rows = db.execute(
+        select(Atividade.id, Atividade.descricao, Atividade.categoria, Atividade.prioridade).where(
+            Atividade.id.in_(ids), Atividade.recorrente.isnot(True), Atividade.serie_id.is_(None),
+            Atividade.copia.isnot(True)
+        )
+    ).all()
+    if rows:
+        db.execute(
+            update(Atividade.__table__).where(Atividade.id == bindparam('_id')).values(content_hash=bindparam('_hash')),
+            [{'_id': r.id, '_hash': models.task_content_hash(r.descricao, r.categoria, r.prioridade)} for r in rows]
+        )
+
+
+def ranked(max_id: int):
+    """Duplicate rows (all but the oldest of each group) with id <= max_id"""
+    Atividade = models.Atividade
+    numbered = select(
+        Atividade.id,
+        Atividade.user_id,
+        func.row_number().over(
+            partition_by=(Atividade.user_id, Atividade.data, Atividade.content_hash),
+            order_by=Atividade.id,
+        ).label("rn"),
+    ).where(
+        Atividade.content_hash.isnot(None),
+        Atividade.id <= max_id,
+        recurrence.is_visible(),
+    ).subquery()
+    return select(numbered.c.id, numbered.c.user_id).where(numbered.c.rn > 1).subquery()
+
+
+def remove_duplicates(db: Session, dry_run: bool = True):
+    """Count (and unless dry_run delete) duplicate tasks in one transaction.
+    Returns {"duplicates": n, "users": {user_id: n}}."""
+    Atividade = models.Atividade
+    # Rows created while this runs are left for the next pass
+    max_id = db.scalar(select(func.max(Atividade.id)))
+    if max_id is None:
+        return {"duplicates": 0, "users": {}}
+    dup = ranked(max_id)
+    users = Counter(dict(db.execute(select(dup.c.user_id, func.count()).group_by(dup.c.user_id)).all()))
+    if not dry_run and users:
+        # Tombstones for delta sync, written from the same window
+        Tombstone = models.SyncTombstone
+        db.execute(insert(Tombstone).from_select(
+            ["entity", "entity_id", "user_id", "deleted_at"],
+            select(literal(sync.TASK), cast(dup.c.id, String), dup.c.user_id, literal(sync.utcnow())),
+        ))
+        db.execute(
+            delete(Atividade).where(Atividade.id.in_(select(ranked(max_id).c.id)))
+            .execution_options(synchronize_session=False)
+        )
+        etags.bump(db, *users)
+        db.commit()
+    return {"duplicates": sum(users.values()), "users": dict(users)}
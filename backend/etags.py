@@ -0,0 +1,90 @@
+"""
+Conditional GETs for the list endpoints.
+
+Each user has a data_version counter that every mutating endpoint bumps in
+the same transaction as the change. A list's ETag is derived from the
+versions of the users whose rows it shows (plus the request URL), so a poll
+with a matching If-None-Match gets a 304 after one primary-key lookup,
+without running the list query or serializing anything.
+"""
+import hashlib
+
+from fastapi import Request, Response
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+import models
+import shares
+
+
+# Session.info key: {user_id: data_version} bumped in the current transaction
+BUMPED = "bumped_versions"
+
+
+def bump(db: Session, *user_ids):
+    """Invalidate the ETags of lists showing these users' rows (not committed).
+
+    The row lock taken here is held until commit, so each user's versions
+    follow commit order; delta sync stamps the transaction's rows with them.
+    """
+    ids = [i for i in user_ids if i is not None]
+    if ids:
+        User = models.User
+        bumped = db.execute(
+            update(User).where(User.id.in_(ids)).values(
+                data_version=func.coalesce(User.data_version, 0) + 1
+            ).returning(User.id, User.data_version)
+        ).all()
+        db.info.setdefault(BUMPED, {}).update(bumped)
+
+
+def versions_query(current_user, shared_owners=(), own_only: bool = False):
+    """Versions a list depends on. Admins see every user's rows (except in
+    own_only lists), so any bump or a user added/removed changes them.
+    `shared_owners` come from the same cache as the list's owner filter, so
+    the ETag never claims rows the list would not show. share_version tells
+    whether that cache entry is current (see shares.py)."""
+    User = models.User
+    if current_user.role == 'admin' and not own_only:
+        return select(func.count(User.id), func.sum(func.coalesce(User.data_version, 0)))
+    return select(User.id, User.data_version, User.share_version).where(
+        User.id.in_([current_user.id, *shared_owners])
+    ).order_by(User.id)
+
+
+def etag_for(request: Request, current_user, version_rows):
+    raw = f"{current_user.id}|{request.url.path}?{request.url.query}|{[tuple(r) for r in version_rows]}"
+    return '"' + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:24] + '"'
+
+
+def check(request: Request, response: Response, etag: str):
+    """Set the ETag on the response; return a 304 response when the client's
+    copy is current, else None"""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    if_none_match = request.headers.get("if-none-match")
+    # If-None-Match uses the weak comparison (proxies may add W/ when compressing)
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip().removeprefix("W/") for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+    return None
+
+
+def not_modified(db: Session, request: Request, response: Response, current_user, shared: bool = False, own_only: bool = False):
+    shared_owners = shares.shared_owner_ids(db, current_user) if shared else ()
+    rows = db.execute(versions_query(current_user, shared_owners, own_only)).all()
+    if shared:
+        # A plan shared since the cached owners were read: read them again
+        current = shares.shared_owner_ids(db, current_user, shares.seen_version(current_user, rows))
+        if current != shared_owners:
+            rows = db.execute(versions_query(current_user, current, own_only)).all()
+    return check(request, response, etag_for(request, current_user, rows))
+
+
+async def not_modified_async(db, request: Request, response: Response, current_user, shared: bool = False):
+    shared_owners = await shares.shared_owner_ids_async(db, current_user) if shared else ()
+    rows = (await db.execute(versions_query(current_user, shared_owners))).all()
+    if shared:
+        current = await shares.shared_owner_ids_async(db, current_user, shares.seen_version(current_user, rows))
+        if current != shared_owners:
+            rows = (await db.execute(versions_query(current_user, current))).all()
+    return check(request, response, etag_for(request, current_user, rows))
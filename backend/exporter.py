@@ -0,0 +1,105 @@
+"""
+Streaming task exports for GET /export.
+
+Rows are read with a server-side cursor (yield_per) and written out as they
+arrive, so memory stays flat whatever the plan size. CSV and NDJSON start
+sending immediately; XLSX uses openpyxl's write-only mode, which spools rows
+to disk and can only be sent once the zip container is closed.
+
+Each generator opens its own session: the request's session is closed before
+a StreamingResponse body is iterated.
+"""
+import csv
+import io
+import json
+import os
+import tempfile
+
+from openpyxl import Workbook
+from sqlalchemy import select
+
+from database import SessionLocal
+import models
+import recurrence
+
+EXPORT_COLUMNS = ["id", "descricao", "data", "status", "prioridade", "categoria"]
+FETCH_SIZE = 1000
+SERIES_BATCH_SIZE = 100
+XLSX_CHUNK_SIZE = 64 * 1024
+
+FORMATS = {
+    "csv": ("text/csv", "phdplan_export.csv"),
+    "ndjson": ("application/x-ndjson", "phdplan_export.ndjson"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "phdplan_export.xlsx"),
+}
+
+
+def iter_task_rows(user_id=None):
+    """Yield batches of export tuples; user_id=None exports every tenant (admin)"""
+    Atividade = models.Atividade
+    db = SessionLocal()
+    try:
+        stmt = select(*[getattr(Atividade, c) for c in EXPORT_COLUMNS]).where(
+            recurrence.is_visible(), Atividade.recorrente.isnot(True)
+        ).order_by(Atividade.id)
+        if user_id is not None:
+            stmt = stmt.where(Atividade.user_id == user_id)
+        result = db.execute(stmt.execution_options(yield_per=FETCH_SIZE))
+        for partition in result.partitions():
+            yield [tuple(row) for row in partition]
+
+        # Series occurrences are computed, not stored: one exceptions query per batch of series
+        series = select(Atividade).where(recurrence.is_series()).order_by(Atividade.id)
+        if user_id is not None:
+            series = series.where(Atividade.user_id == user_id)
+        result = db.execute(series.execution_options(yield_per=SERIES_BATCH_SIZE))
+        for partition in result.scalars().partitions():
+            occurrences = recurrence.expand_rows(db, partition)
+            for start in range(0, len(occurrences), FETCH_SIZE):
+                yield [tuple(getattr(o, c) for c in EXPORT_COLUMNS) for o in occurrences[start:start + FETCH_SIZE]]
+    finally:
+        db.close()
+
+
+def stream_csv(user_id=None):
+    # BOM so Excel opens the UTF-8 accents correctly
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in iter_task_rows(user_id):
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def stream_ndjson(user_id=None):
+    for batch in iter_task_rows(user_id):
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=str, ensure_ascii=False) + "\n"
+            for row in batch
+        ).encode("utf-8")
+
+
+def stream_xlsx(user_id=None):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(EXPORT_COLUMNS)
+    for batch in iter_task_rows(user_id):
+        for row in batch:
+            sheet.append(row)
+
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        workbook.save(path)
+        with open(path, "rb") as f:
+            while chunk := f.read(XLSX_CHUNK_SIZE):
+                yield chunk
+    finally:
+        os.unlink(path)
+
+
+STREAMERS = {"csv": stream_csv, "ndjson": stream_ndjson, "xlsx": stream_xlsx}
@@ -0,0 +1,93 @@
+"""
+Background Excel imports.
+
+POST /import/excel only stores the upload and queues a job; parsing and
+inserting run on a small thread pool so the event loop and the request
+threadpool stay free. Job state lives in the import_jobs table, so any
+worker can answer GET /import/jobs/{id}.
+"""
+import json
+import os
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from database import SessionLocal, engine
+import importer
+import models
+
+executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("IMPORT_WORKERS", "1")),
+    thread_name_prefix="import"
+)
+
+
+def create_job(db, user_id, filename):
+    job = models.ImportJob(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        filename=filename,
+        status="queued",
+        rows_parsed=0,
+        rows_inserted=0,
+        created_at=datetime.utcnow()
+    )
+    db.add(job)
+    db.commit()
+    return job
+
+
+def update_job(job_id, **values):
+    # Own short session: progress must be visible while the import transaction is open
+    db = SessionLocal()
+    try:
+        db.query(models.ImportJob).filter(models.ImportJob.id == job_id).update(values)
+        db.commit()
+    finally:
+        db.close()
+
+
+def run_job(job_id, path, user_id, delete_missing=False):
+    update_job(job_id, status="running")
+
+    def progress(parsed, inserted):
+        # SQLite has a single writer: while the import transaction holds it
+        # (inserted > 0) only the final counts can be written
+        if inserted == 0 or engine.dialect.name != "sqlite":
+            update_job(job_id, rows_parsed=parsed, rows_inserted=inserted)
+
+    db = SessionLocal()
+    try:
+        result = importer.import_workbook(db, path, user_id, progress=progress, delete_missing=delete_missing)
+        update_job(
+            job_id, status="done", result=json.dumps(result), finished_at=datetime.utcnow(),
+            rows_inserted=sum(diff["inserted"] for diff in result.values())
+        )
+    except Exception as e:
+        traceback.print_exc()
+        update_job(job_id, status="failed", error=f"Import failed: {e}", finished_at=datetime.utcnow())
+    finally:
+        db.close()
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def submit(job_id, path, user_id, delete_missing=False):
+    executor.submit(run_job, job_id, path, user_id, delete_missing)
+
+
+def job_status(job):
+    return {
+        "id": job.id,
+        "status": job.status,
+        "filename": job.filename,
+        "rows_parsed": job.rows_parsed,
+        "rows_inserted": job.rows_inserted,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+    }
@@ -1,15 +1,390 @@
+"""
+Excel workbook import, shared by POST /import/excel and the command line.
+
+Sheets are normalized column-wise with pandas (no per-row Python loop) and
+applied as a diff against the user's rows: new rows are written with chunked
+Core executemany inserts (COPY on Postgres), changed rows are updated and
+rows missing from the sheet are optionally deleted.
+
+    python importer.py   # seeds the default admin from the local workbook
+"""
+import csv
+import hashlib
+import io
+import shutil
+import traceback
+from collections import Counter
+from datetime import timedelta
+
+import numpy as np
 import pandas as pd
+from sqlalchemy import bindparam, case, delete, select, update
 from sqlalchemy.orm import Session
+
 from database import SessionLocal, engine
+import etags
 import models
-from datetime import timedelta
+import sync
 from auth import get_password_hash # Import hashing function
-import traceback
 
-# Ensure tables exist
-models.Base.metadata.create_all(bind=engine)
+TASK_SHEET = 'Plano Diário'
+STRATEGY_SHEET = 'Temas Semanais'
+
+DONE_STATUSES = ['ok', 'feito', 'concluído', 'concluido']
+
+# Spreadsheet column -> Atividade column, copied as text ('' when empty)
+TASK_TEXT_COLUMNS = {
+    'Como': 'como',
+    'Onde': 'onde',
+    'CTA': 'cta',
+    'Duração (min)': 'duracao',
+    'KPI/Meta': 'kpi_meta',
+    'Tipo de dia': 'tipo_dia',
+    'Dia da semana': 'dia_semana',
+    'Tema macro': 'tema_macro',
+    'Ângulo/Trilha': 'angulo',
+    'Canal/Área': 'canal_area',
+}
+
+STRATEGY_ANGLES = [
+    ('Financeiro', 'Ângulo Financeiro'),
+    ('Negociação', 'Ângulo Negociação/Vendas'),
+    ('Gestão', 'Ângulo Gestão Comercial'),
+]
+
+INSERT_CHUNK_SIZE = 1000
+
+
+def text_column(df, column, default=''):
+    """Column as strings, with `default` for NaN cells or a missing column"""
+    if column not in df:
+        return pd.Series(default, index=df.index, dtype=object)
+    values = df[column]
+    return values.where(values.notna(), default).astype(str)
+
+
+def date_column(df, column):
+    """Column as datetimes (NaT when empty or unparseable). Excel date cells
+    arrive as timestamps; text cells are DD/MM/YYYY like the sheets."""
+    if column not in df:
+        return pd.Series(pd.NaT, index=df.index)
+    return pd.to_datetime(df[column], errors='coerce', dayfirst=True, format='mixed')
+
+
+def invalid_dates(df, dates, sheet):
+    """Number of filled rows dropped because their date doesn't parse"""
+    dropped = int((dates.isna() & df.notna().any(axis=1)).sum())
+    if dropped:
+        print(f"Sheet '{sheet}': {dropped} rows skipped (missing or invalid date)")
+    return dropped
+
+
+def normalize_tasks(df, user_id):
+    """'Plano Diário' sheet -> (list of Atividade column dicts, rows skipped for their date)"""
+    df = df.drop_duplicates()
+    dates = date_column(df, 'Data')
+    skipped = invalid_dates(df, dates, TASK_SHEET)
+    df, dates = df[dates.notna()], dates[dates.notna()]
+
+    status = np.where(
+        text_column(df, 'Status').str.lower().isin(DONE_STATUSES), 'Feito', 'A fazer'
+    )
+    # "O que" is the visible description; fall back to "Descrição da ação"
+    o_que = text_column(df, 'O que')
+    descricao_original = text_column(df, 'Descrição da ação')
+    descricao = o_que.where(o_que.str.strip() != '', descricao_original)
+
+    out = pd.DataFrame({
+        'descricao': descricao,
+        'data': dates.dt.date,
+        'status': status,
+        'prioridade': text_column(df, 'Prioridade', 'Média'),
+        'categoria': text_column(df, 'Categoria', 'Geral'),
+        'o_que': o_que,
+        'descricao_original': descricao_original,
+    }, index=df.index)
+    for source, target in TASK_TEXT_COLUMNS.items():
+        out[target] = text_column(df, source)
+    out['user_id'] = user_id
+    return out.to_dict('records'), skipped
+
+
+def normalize_strategies(df, user_id):
+    """'Temas Semanais' sheet -> (list of Estrategia column dicts, rows skipped for their date)"""
+    starts = date_column(df, 'Semana (início)')
+    skipped = invalid_dates(df, starts, STRATEGY_SHEET)
+    df, starts = df[starts.notna()], starts[starts.notna()]
+
+    # "Label: value" for each filled angle, joined with " | "
+    parts = []
+    for label, column in STRATEGY_ANGLES:
+        value = text_column(df, column)
+        parts.append(np.where(value.str.strip() != '', label + ': ' + value, ''))
+    descricao = pd.Series([' | '.join(p for p in row if p) for row in zip(*parts)], index=df.index, dtype=object)
+
+    out = pd.DataFrame({
+        'tema': text_column(df, 'Tema macro'),
+        'semana_inicio': starts.dt.date,
+        'semana_fim': (starts + timedelta(days=6)).dt.date,
+        'descricao_detalhada': descricao,
+    }, index=df.index)
+    out['user_id'] = user_id
+    return out.to_dict('records'), skipped
+
+
+def copy_rows(db: Session, table, rows):
+    """Postgres fast path: stream rows through COPY ... FROM STDIN"""
+    columns = list(rows[0].keys())
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(['\\N' if row[c] is None else row[c] for c in columns])
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer
+        )
+    finally:
+        cursor.close()
+
+
+def bulk_insert(db: Session, model, rows, chunk_size=INSERT_CHUNK_SIZE, on_chunk=None):
+    """Insert column dicts in the session's transaction without building ORM objects.
+
+    `on_chunk(n)` is called with the number of rows written after each chunk.
+    """
+    if not rows:
+        return 0
+    table = model.__table__
+    if db.get_bind().dialect.name == 'postgresql':
+        # COPY skips column defaults
+        if 'updated_at' in table.c:
+            now = sync.utcnow()
+            rows = [dict(row, updated_at=now) for row in rows]
+        copy_rows(db, table, rows)
+        if on_chunk:
+            on_chunk(len(rows))
+    else:
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            db.execute(table.insert(), chunk)
+            if on_chunk:
+                on_chunk(len(chunk))
+    return len(rows)
+
+
+def read_workbook(path, user_id):
+    """Parse the workbook into (tasks, strategies, rows skipped per sheet).
+    Sheets that are absent come back as None."""
+    with pd.ExcelFile(path) as workbook:
+        tasks = strategies = None
+        skipped = {}
+        if TASK_SHEET in workbook.sheet_names:
+            tasks, skipped["tasks"] = normalize_tasks(workbook.parse(TASK_SHEET), user_id)
+        else:
+            print(f"Sheet '{TASK_SHEET}' not found, tasks left untouched")
+        if STRATEGY_SHEET in workbook.sheet_names:
+            strategies, skipped["strategies"] = normalize_strategies(workbook.parse(STRATEGY_SHEET), user_id)
+        else:
+            print(f"Sheet '{STRATEGY_SHEET}' not found, strategies left untouched")
+    return tasks, strategies, skipped
+
+
+SYNC_ENTITIES = {models.Atividade: sync.TASK, models.Estrategia: sync.STRATEGY}
+
+# Natural key of a spreadsheet row: a re-import matches rows on it and only
+# writes the ones whose content hash changed. Only columns every importer
+# stored, so rows imported before keys existed are matched too.
+TASK_KEY_COLUMNS = ['data', 'descricao', 'categoria']
+STRATEGY_KEY_COLUMNS = ['semana_inicio', 'tema']
+
+# Defaults the previous importer wrote as the literal string 'nan'
+TEXT_DEFAULTS = {'prioridade': 'Média', 'categoria': 'Geral'}
+
+
+def key_value(column, value):
+    if value is None or value == 'nan':
+        return TEXT_DEFAULTS.get(column, '')
+    return str(value)
+
+
+def digest(values):
+    return hashlib.sha1("\x1f".join(values).encode("utf-8")).hexdigest()
+
+
+def assign_keys(rows, key_columns):
+    """Add import_hash (all imported values) and import_key (natural key plus
+    the occurrence number, so identical rows in a sheet stay distinct)"""
+    seen = Counter()
+    for row in rows:
+        row['import_hash'] = digest([key_value(c, row[c]) for c in sorted(row) if c != 'user_id'])
+        base = digest([key_value(c, row[c]) for c in key_columns])
+        row['import_key'] = f"{base}#{seen[base]}"
+        seen[base] += 1
+
+
+def existing_rows_by_key(db: Session, model, user_id, key_columns, value_columns=()):
+    """{import_key: row} for the user's importable rows, with the key and
+    value columns.
+
+    Rows written before keys existed get one computed from their stored
+    values, so the first diff import adopts them instead of duplicating them.
+    """
+    table = model.__table__
+    columns = list(dict.fromkeys([*key_columns, *value_columns]))
+    stmt = select(table.c.id, table.c.import_key, table.c.import_hash, *[table.c[c] for c in columns]).where(
+        table.c.user_id == user_id
+    ).order_by(table.c.id)
+    if model is models.Atividade:
+        # Series rows and their exceptions are created in the app, never imported
+        stmt = stmt.where(table.c.recorrente.isnot(True), table.c.serie_id.is_(None), table.c.excluida.isnot(True))
+        if 'content_hash' not in columns:
+            stmt = stmt.add_columns(table.c.content_hash)
+
+    existing, legacy = {}, []
+    for row in db.execute(stmt):
+        if row.import_key:
+            existing[row.import_key] = row
+        else:
+            legacy.append(row)
+
+    seen = Counter()
+    for row in legacy:
+        base = digest([key_value(c, row._mapping[c]) for c in key_columns])
+        while f"{base}#{seen[base]}" in existing:
+            seen[base] += 1
+        existing[f"{base}#{seen[base]}"] = row
+        seen[base] += 1
+    return existing
+
+
+def differs(model, current, row, value_columns):
+    """Whether an adopted row's stored values differ from the sheet's (legacy
+    rows can hold 'nan' strings or statuses the sheet has since changed)"""
+    for column in value_columns:
+        stored = current._mapping[column]
+        if model is models.Atividade and column == 'status':
+            # Same rule as updates: the sheet can complete a task, never reopen it
+            if row[column] == 'Feito' and stored != 'Feito':
+                return True
+        elif stored != row[column]:
+            return True
+    return False
+
+
+def sync_rows(db: Session, model, rows, user_id, key_columns, delete_missing=False, on_chunk=None):
+    """Insert new rows, update changed ones and optionally delete rows missing
+    from the sheet. Returns the diff counts."""
+    table = model.__table__
+    assign_keys(rows, key_columns)
+    dedup = model is models.Atividade
+    if dedup:
+        for row in rows:
+            row['content_hash'] = models.task_content_hash(row['descricao'], row['categoria'], row['prioridade'])
+    value_columns = [c for c in (rows[0] if rows else {}) if c not in ('user_id', 'import_key', 'import_hash')]
+    existing = existing_rows_by_key(db, model, user_id, key_columns, value_columns)
+
+    # A new task with the content of one the user already has that day (made
+    # in the app, or an earlier sheet row) is skipped rather than duplicated
+    seen = set()
+    if dedup:
+        seen = {(row.data, row.content_hash) for row in existing.values()}
+
+    to_insert, to_update, adopted, unchanged, duplicates = [], [], [], 0, 0
+    for row in rows:
+        current = existing.pop(row['import_key'], None)
+        if current is None:
+            if dedup:
+                content = (row['data'], row['content_hash'])
+                if content in seen:
+                    duplicates += 1
+                    continue
+                seen.add(content)
+            to_insert.append(row)
+        elif current.import_key is None and not differs(model, current, row, value_columns):
+            adopted.append({'_id': current.id, '_key': row['import_key'], '_hash': row['import_hash']})
+        elif current.import_key is None or current.import_hash != row['import_hash']:
+            # Changed rows, and adopted rows whose stored values are stale, get the sheet's values
+            to_update.append({'_id': current.id, **{f"_{c}": v for c, v in row.items() if c != 'user_id'}})
+        else:
+            unchanged += 1
+    # Only rows that came from an import can go missing; app-created ones stay
+    missing = [row.id for row in existing.values() if row.import_key is not None]
+
+    bulk_insert(db, model, to_insert, on_chunk=on_chunk)
+
+    if adopted:
+        db.execute(
+            update(table).where(table.c.id == bindparam('_id')).values(
+                import_key=bindparam('_key'), import_hash=bindparam('_hash')
+            ),
+            adopted
+        )
+
+    if to_update:
+        values = {c[1:]: bindparam(c) for c in to_update[0] if c != '_id'}
+        if model is models.Atividade:
+            # A changed sheet row can complete a task but never reopens one done in the app
+            values['status'] = case((bindparam('_status') == 'Feito', bindparam('_status')), else_=table.c.status)
+        for start in range(0, len(to_update), INSERT_CHUNK_SIZE):
+            db.execute(update(table).where(table.c.id == bindparam('_id')).values(values), to_update[start:start + INSERT_CHUNK_SIZE])
+
+    deleted = 0
+    if delete_missing and missing:
+        sync.record_deletions(db, SYNC_ENTITIES[model], user_id, missing)
+        for start in range(0, len(missing), INSERT_CHUNK_SIZE):
+            deleted += db.execute(delete(table).where(table.c.id.in_(missing[start:start + INSERT_CHUNK_SIZE]))).rowcount
+
+    return {
+        "inserted": len(to_insert),
+        "updated": len(to_update),
+        "unchanged": unchanged + len(adopted),
+        "deleted": deleted,
+        "missing": len(missing),
+        "duplicates": duplicates,
+    }
+
+
+def import_workbook(db: Session, path, user_id, progress=None, delete_missing=False):
+    """Apply the workbook to the user's tasks and strategies as a diff.
+
+    The workbook is parsed before anything is written, and all writes share
+    one transaction. `progress(rows_parsed, rows_inserted)` is called as the
+    import advances.
+    """
+    report = progress or (lambda rows_parsed, rows_inserted: None)
+    tasks, strategies, skipped = read_workbook(path, user_id)
+    rows_parsed = len(tasks or []) + len(strategies or [])
+    inserted = 0
+    report(rows_parsed, inserted)
+
+    def on_chunk(n):
+        nonlocal inserted
+        inserted += n
+        report(rows_parsed, inserted)
+
+    summary = {}
+    try:
+        if tasks is not None:
+            summary["tasks"] = sync_rows(db, models.Atividade, tasks, user_id, TASK_KEY_COLUMNS, delete_missing, on_chunk)
+        if strategies is not None:
+            summary["strategies"] = sync_rows(db, models.Estrategia, strategies, user_id, STRATEGY_KEY_COLUMNS, delete_missing, on_chunk)
+        for name, count in skipped.items():
+            summary[name]["invalid_dates"] = count
+        etags.bump(db, user_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return summary
+
 
 def import_data():
+    # Ensure tables exist
+    models.Base.metadata.create_all(bind=engine)
+
     db = SessionLocal()
     # Create Default User
     admin_email = "admin@phdplan.com"
@@ -24,144 +399,32 @@ def import_data():
         db.add(default_user)
         db.commit()
         db.refresh(default_user)
-    
+
     user_id = default_user.id
     print(f"Importing data for User ID: {user_id}")
-    
-    # Original path (Excel is closed now)
-    # Original path 
+
+    # Original path
     source_excel = r'c:\Users\Lenovo\OneDrive\0 Paulo\1 ATUAL\0 UDEMY GROWTH\0 Plano_Acao_Growth_Udemy_Jan-Mar_2026_RegraOperacional.xlsx'
     excel_file = 'temp_import_v2.xlsx'
 
-    import shutil
     try:
         shutil.copy2(source_excel, excel_file)
         print("Copied Excel to temp file successfully.")
     except Exception as e:
         print(f"Warning: Could not copy file (maybe open? trying anyway): {e}")
         excel_file = source_excel # Fallback
-    
-    print("Reading Excel file...")
-    
-    # Clear existing data to prevent duplication
-    try:
-        num_deleted = db.query(models.Atividade).delete()
-        db.query(models.Estrategia).delete()
-        db.commit()
-        print(f"Cleared {num_deleted} existing tasks and strategies.")
-    except Exception as e:
-        print(f"Error clearing data: {e}. Proceeding...")
-        db.rollback()
 
-    # Import Atividades
+    print("Reading Excel file...")
     try:
-        df_atividades = pd.read_excel(excel_file, sheet_name='Plano Diário')
-        # Deduplicate rows based on all columns to avoid strict duplicates in source
-        initial_count = len(df_atividades)
-        df_atividades = df_atividades.drop_duplicates()
-        if len(df_atividades) < initial_count:
-            print(f"Removed {initial_count - len(df_atividades)} duplicate rows.")
-            
-        print(f"Found {len(df_atividades)} unique rows in Plano Diário")
-        print(f"Columns: {df_atividades.columns.tolist()}") # DEBUG
-        
-        for index, row in df_atividades.iterrows():
-            # Check for existing to avoid duplicates if re-run (simplified check)
-            # ideally check by unique fields, but for now we trust the init.
-            
-            # Map fields
-            # We focus on Data as the primary key for existence check mostly
-            pass
-
-            data_val = row.get('Data')
-            if pd.isna(data_val):
-                continue
-            
-            # Ensure correct date format
-            data_date = pd.to_datetime(data_val).date()
-            
-            # Status normalization
-            status_raw = row.get('Status')
-            status = 'A fazer'
-            if str(status_raw).lower() in ['ok', 'feito', 'concluído', 'concluido']:
-                status = 'Feito'
-            
-            # Mapping new fields
-            o_que = str(row.get('O que') if not pd.isna(row.get('O que')) else '')
-            descricao_original = str(row.get('Descrição da ação') if not pd.isna(row.get('Descrição da ação')) else '')
-            
-            # User wants "O QUE" to be the main description visible
-            # If O Que is empty, fallback to Descricao da acao, then O que (empty)
-            final_descricao = o_que if o_que.strip() else descricao_original
-            
-            atividade = models.Atividade(
-                descricao=final_descricao,
-                data=data_date,
-                status=status,
-                prioridade=str(row.get('Prioridade', 'Média')),
-                categoria=str(row.get('Categoria', 'Geral')),
-                
-                # New Fields
-                o_que=o_que,
-                descricao_original=descricao_original,
-                como=str(row.get('Como', '')),
-                onde=str(row.get('Onde', '')),
-                cta=str(row.get('CTA', '')),
-                duracao=str(row.get('Duração (min)', '')),
-                kpi_meta=str(row.get('KPI/Meta', '')),
-                tipo_dia=str(row.get('Tipo de dia', '')),
-                dia_semana=str(row.get('Dia da semana', '')),
-                tema_macro=str(row.get('Tema macro', '')),
-                angulo=str(row.get('Ângulo/Trilha', '')),
-                canal_area=str(row.get('Canal/Área', '')),
-                user_id=user_id # Assign to default user
-            )
-            db.add(atividade)
-            
-        print("Atividades imported (pending commit).")
-
-        # Import Estrategia
-        df_estrategia = pd.read_excel(excel_file, sheet_name='Temas Semanais')
-        print(f"Found {len(df_estrategia)} rows in Temas Semanais")
-
-        for index, row in df_estrategia.iterrows():
-            semana_inicio_val = row.get('Semana (início)')
-            if pd.isna(semana_inicio_val):
-                continue
-            
-            # Ensure it is a datetime object
-            semana_inicio = pd.to_datetime(semana_inicio_val)
-
-            tema = str(row.get('Tema macro', ''))
-            
-            # Combine angles for description
-            angles = [
-                f"Financeiro: {row.get('Ângulo Financeiro', '')}",
-                f"Negociação: {row.get('Ângulo Negociação/Vendas', '')}",
-                f"Gestão: {row.get('Ângulo Gestão Comercial', '')}"
-            ]
-            descricao_detalhada = " | ".join([a for a in angles if 'nan' not in a.lower()])
-
-            estrategia = models.Estrategia(
-                tema=tema,
-                semana_inicio=semana_inicio.date(), # Store as date
-                semana_fim=(semana_inicio + timedelta(days=6)).date(),
-                descricao_detalhada=descricao_detalhada,
-                user_id=user_id
-            )
-            db.add(estrategia)
-        
-        print("Estrategia imported (pending commit).")
-        
-        db.commit()
+        result = import_workbook(db, excel_file, user_id)
+        for entity, diff in result.items():
+            print(f"{entity}: {diff}")
         print("Database successfully populated!")
-        
     except Exception as e:
         with open('import_error.txt', 'w') as f:
             f.write(f"Error: {e}\n")
             traceback.print_exc(file=f)
         print(f"Error importing data: {e}")
-        db.rollback()
     finally:
         db.close()
 
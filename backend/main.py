@@ -1,81 +1,44 @@
-from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File
+from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from typing import List, Optional
-import models, database, auth
+from typing import List, Optional, Union
+import models, database, auth, recurrence, import_jobs, exporter, queries, sync, etags, schemas, migrations, passwords, shares, stats, duplicates, transfer
 from datetime import date, timedelta
 from pydantic import BaseModel
-import pandas as pd
 import os
 from dotenv import load_dotenv
 import tempfile
 import shutil
+import time
 
 from fastapi.staticfiles import StaticFiles
 
-from sqlalchemy import text
+from sqlalchemy import update
 
 # Load environment variables
 load_dotenv()
 
-# Schema migration logic
-def apply_migrations():
-    """Manually apply migrations for new columns to avoid data loss on Render"""
+def prepare_database():
+    """Schema check and housekeeping on boot, with the time each phase took.
+    The schema check is one SELECT when the database is at the Alembic head;
+    otherwise the pending revisions run once under a lock (see migrations.py)."""
+    started = time.perf_counter()
+    schema_state = migrations.ensure_schema(database.engine)
+    print(f"[startup] schema {schema_state} in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    started = time.perf_counter()
     db = database.SessionLocal()
     try:
-        # Check and add new columns to Atividade
-        columns_to_add = {
-            "recorrencia_tipo": "VARCHAR",
-            "recorrencia_intervalo": "INTEGER",
-            "recorrencia_dia_mes": "INTEGER",
-            "recorrencia_dias_semana": "VARCHAR",
-            "recorrencia_inicio": "DATE",
-            "recorrencia_fim": "DATE",
-            "acao": "VARCHAR"
-        }
-        
-        for col, col_type in columns_to_add.items():
-            try:
-                db.execute(text(f"ALTER TABLE atividades ADD COLUMN {col} {col_type}"))
-                db.commit()
-                print(f"Added column {col} to atividades")
-            except Exception as e:
-                db.rollback()
-                # Ignore if column already exists
-                if "already exists" not in str(e).lower() and "duplicate column" not in str(e).lower():
-                    print(f"Migration error for {col}: {e}")
-
-        # Insights extended fields migration
-        insight_cols = {
-            "o_que": "VARCHAR",
-            "como": "VARCHAR",
-            "onde": "VARCHAR",
-            "cta": "VARCHAR",
-            "duracao": "VARCHAR",
-            "kpi_meta": "VARCHAR",
-            "tipo_dia": "VARCHAR",
-            "dia_semana": "VARCHAR",
-            "tema_macro": "VARCHAR",
-            "angulo": "VARCHAR",
-            "canal_area": "VARCHAR",
-            "prioridade": "VARCHAR"
-        }
-        for col, col_type in insight_cols.items():
-            try:
-                db.execute(text(f"ALTER TABLE insights ADD COLUMN {col} {col_type}"))
-                db.commit()
-            except Exception:
-                db.rollback()
-
+        sync.prune_tombstones(db)
     finally:
         db.close()
+    print(f"[startup] tombstone pruning in {(time.perf_counter() - started) * 1000:.0f}ms")
 
-# Create tables
-models.Base.metadata.create_all(bind=database.engine)
-apply_migrations()
+prepare_database()
 
-app = FastAPI(title="PHDPlan API")
+app = FastAPI(title="PHDPlan API", default_response_class=ORJSONResponse)
 
 # Configure CORS for production and development
 # In production, Render will provide the frontend from the same domain
@@ -92,6 +55,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Determine static files path (local vs production)
@@ -101,6 +65,12 @@ if os.path.exists("frontend"):
 
 app.mount("/app", StaticFiles(directory=static_dir, html=True), name="frontend")
 
+# Async versions of the hot endpoints; registered first so they take
+# precedence over the sync handlers below
+if database.ASYNC_DB_ENABLED:
+    import async_api
+    app.include_router(async_api.router)
+
 
 # Dependency
 def get_db():
@@ -110,6 +80,14 @@ def get_db():
     finally:
         db.close()
 
+# --- PAGINATION ---
+MAX_PAGE_SIZE = queries.MAX_PAGE_SIZE
+resolve_cursor = queries.resolve_cursor
+
+def keyset_page(db: Session, stmt, id_column, after_id: Optional[int], limit: int, response: Response):
+    """Return one page of rows ordered by id DESC and set X-Next-Cursor when more rows exist"""
+    return queries.trim_page(db.execute(queries.keyset(stmt, id_column, after_id, limit)).all(), limit, response)
+
 @app.get("/")
 def read_root():
     return {"message": "PHDPlan Backend Operational"}
@@ -133,8 +111,9 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
     db_user = db.query(models.User).filter(models.User.email == user.email).first()
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
+    db.rollback() # no connection held while hashing
     
-    hashed_password = auth.get_password_hash(user.password)
+    hashed_password = passwords.hash_password(user.password)
     new_user = models.User(email=user.email, hashed_password=hashed_password)
     db.add(new_user)
     db.commit()
@@ -150,16 +129,24 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
 @app.post("/auth/token", response_model=Token)
 def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     user = db.query(models.User).filter(models.User.email == form_data.username).first()
-    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+    hashed_password = user.hashed_password if user else None
+    # Give the connection back to the pool while the hash is checked
+    db.rollback()
+    verified, new_hash = passwords.verify_and_update(form_data.password, hashed_password) if user else (False, None)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_hash:
+        # Stored with another PASSWORD_HASH_ROUNDS: upgrade it now that we have the password
+        user.hashed_password = new_hash
+        db.commit()
     
     access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = auth.create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": form_data.username}, expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -184,8 +171,9 @@ def create_user_admin(user: UserCreate, db: Session = Depends(get_db), current_u
     db_user = db.query(models.User).filter(models.User.email == user.email).first()
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
+    db.rollback() # no connection held while hashing
     
-    hashed_password = auth.get_password_hash(user.password)
+    hashed_password = passwords.hash_password(user.password)
     # Default role is 'user', unless we want to allow specifying it here. 
     # For simplicity, let's allow updating role later or assume 'user' for now.
     # Actually, let's create as 'user' and they can edit it.
@@ -208,16 +196,23 @@ def update_user(user_id: int, user_update: UserUpdate, db: Session = Depends(get
     db_user = db.query(models.User).filter(models.User.id == user_id).first()
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
+    hashed_password = None
+    if user_update.password:
+        db.rollback() # no connection held while hashing; db_user reloads below
+        hashed_password = passwords.hash_password(user_update.password)
         
+    old_email = db_user.email
     if user_update.role:
         db_user.role = user_update.role
     if user_update.email:
         db_user.email = user_update.email
-    if user_update.password:
-        db_user.hashed_password = auth.get_password_hash(user_update.password)
+    if hashed_password:
+        db_user.hashed_password = hashed_password
         
+    etags.bump(db, user_id)
     db.commit()
     db.refresh(db_user)
+    auth.invalidate_user(old_email, db_user.email)
     return {"id": db_user.id, "email": db_user.email, "role": db_user.role}
 
 @app.delete("/users/{user_id}")
@@ -234,30 +229,125 @@ def delete_user(user_id: int, db: Session = Depends(get_db), current_user: model
     
     db.delete(db_user)
     db.commit()
+    auth.invalidate_user(db_user.email)
     return {"message": "User deleted"}
 
+@app.get("/admin/user-cache")
+def read_user_cache_stats(current_user: models.User = Depends(auth.get_current_user)):
+    """Hit/miss counters of this worker's authenticated-user cache"""
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return auth.user_cache.stats()
 
-@app.get("/tasks")
-def read_tasks(skip: int = 0, limit: int = 1000, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    # Filter by user
-    if current_user.role == 'admin':
-         tasks = db.query(models.Atividade).offset(skip).limit(limit).all()
-    else:
-         # Generic tasks (own) + Shared tasks
-         # Get IDs of owners who shared with me
-         shares = db.query(models.PlanShare).filter(models.PlanShare.shared_with_email == current_user.email).all()
-         shared_owner_ids = [s.owner_id for s in shares]
-         
-         # Combined query
-         # user_id == my_id OR user_id IN shared_owner_ids
-         tasks = db.query(models.Atividade).filter(
-             (models.Atividade.user_id == current_user.id) | 
-             (models.Atividade.user_id.in_(shared_owner_ids))
-         ).offset(skip).limit(limit).all()
-    
-    # Sort by ID desc
-    tasks.sort(key=lambda x: x.id, reverse=True)
-    return tasks
+@app.get("/admin/pool")
+def read_pool_stats(current_user: models.User = Depends(auth.get_current_user)):
+    """Connection pool state and checkout/wait counters of this worker"""
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return database.pool_status()
+
+@app.get("/admin/stats")
+def read_admin_stats(
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Per-user counts (tasks by status, insights, strategies, categories,
+    shares) and last activity, newest users first; page with X-Next-Cursor"""
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Not authorized")
+    users = keyset_page(db, stats.users(), models.User.id, resolve_cursor(cursor, after_id), limit, response)
+    return schemas.render(stats.user_stats(db, users), response)
+
+@app.post("/admin/tasks/dedup")
+def dedup_tasks(dry_run: bool = True, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+    """Delete duplicate tasks of every user, keeping the oldest of each group
+    (see duplicates.py). With dry_run (the default) only counts them."""
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return {"dry_run": dry_run, **duplicates.remove_duplicates(db, dry_run)}
+
+class PlanTransfer(BaseModel):
+    target_id: int
+    mode: str = "move" # move, copy
+
+@app.post("/admin/users/{user_id}/transfer")
+def transfer_plan(user_id: int, body: PlanTransfer, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+    """Move or copy every task, strategy, insight, category and action of the
+    user (and, when moving, their shares) to target_id in one transaction"""
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Not authorized")
+    try:
+        counts = transfer.transfer_plan(db, user_id, body.target_id, body.mode)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"mode": body.mode, "source_id": user_id, "target_id": body.target_id, "rows": counts}
+
+
+@app.get("/tasks", response_model=List[schemas.TaskOut])
+def read_tasks(
+    request: Request,
+    response: Response,
+    limit: int = Query(1000, ge=1, le=MAX_PAGE_SIZE),
+    after_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    fields: Optional[str] = None,
+    owner: Optional[str] = Query(None, pattern="^(own|shared)$"),
+    filters: dict = Depends(queries.task_filters),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Tasks page (newest first). Recurring series are expanded into their
+    occurrences within from/to (or their whole range when no window is given),
+    so a page can hold more items than `limit` stored rows.
+
+    Filters: status, prioridade, categoria, canal_area, tema_macro (repeat a
+    parameter for several values) and owner=own|shared; the cursor pages
+    through the filtered rows.
+
+    `fields` (comma separated, e.g. id,descricao,data,status) limits the
+    columns selected and returned; GET /tasks/{id} has the full row."""
+    names = queries.parse_fields(fields, schemas.TaskOut)
+    cached = etags.not_modified(db, request, response, current_user, shared=True)
+    if cached is not None:
+        return cached
+    shared_owners = shares.shared_owner_ids(db, current_user)
+    stmt = queries.task_page(current_user, shared_owners, resolve_cursor(cursor, after_id), limit, date_from, date_to, names, filters, owner)
+    tasks = queries.trim_page(db.execute(stmt).all(), limit, response)
+    return schemas.render(schemas.plain(recurrence.expand_rows(db, tasks, date_from, date_to), names), response)
+
+@app.get("/tasks/{task_id}", response_model=schemas.TaskOut)
+def read_task(task_id: str, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+    """One task or computed occurrence with every column"""
+    parsed = recurrence.parse_task_id(task_id)
+    if parsed is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    row_id, day = parsed
+    visible = queries.tasks(current_user, shares.shared_owner_ids(db, current_user))
+    Atividade = models.Atividade
+
+    if day is not None:
+        # An edited occurrence is served by its exception row
+        exception = db.execute(visible.where(Atividade.serie_id == row_id, Atividade.serie_data == day)).first()
+        if exception is not None:
+            return schemas.render(exception._asdict())
+
+    row = db.execute(visible.where(Atividade.id == row_id)).first()
+    if row is None or (day is not None and not row.recorrente):
+        raise HTTPException(status_code=404, detail="Task not found")
+    if day is None:
+        return schemas.render(row._asdict())
+    occurrences = recurrence.expand_rows(db, [row], day, day)
+    if not occurrences:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return schemas.render(schemas.plain(occurrences)[0])
 
 class TaskCreate(BaseModel):
     descricao: str
@@ -318,115 +408,243 @@ class TaskUpdate(BaseModel):
 def create_task(task: TaskCreate, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
     task_data = task.dict()
     
-    # Handle Recurrence logic
+    # Recurring tasks are stored once as a series; occurrences are expanded on read
     if task.recorrencia_tipo and task.recorrencia_inicio and task.recorrencia_fim:
-        start_date = task.recorrencia_inicio
-        end_date = task.recorrencia_fim
-        current_date = start_date
-        
-        tasks_to_create = []
-        
-        while current_date <= end_date:
-            should_create = False
-            
-            if task.recorrencia_tipo == 'n_dias' and task.recorrencia_intervalo:
-                # This logic is slightly complex for "every n days" starting from start_date
-                delta = (current_date - start_date).days
-                if delta % task.recorrencia_intervalo == 0:
-                    should_create = True
-            
-            elif task.recorrencia_tipo == 'dia_mes' and task.recorrencia_dia_mes:
-                if current_date.day == task.recorrencia_dia_mes:
-                    should_create = True
-                    
-            elif task.recorrencia_tipo == 'dia_semana' and task.recorrencia_dias_semana:
-                # 0=Monday, etc.
-                allowed_days = [int(d) for d in task.recorrencia_dias_semana.split(',') if d.strip()]
-                if current_date.weekday() in allowed_days:
-                    should_create = True
-            
-            if should_create:
-                # Create a task instance for this date
-                instance_data = task_data.copy()
-                instance_data['data'] = current_date
-                # Remove recurrence metadata or keep it? Let's keep it for reference but maybe not needed for generated instances
-                # Actually, better to keep it so we know they are part of a series.
-                tasks_to_create.append(models.Atividade(**instance_data, user_id=current_user.id))
-            
-            current_date += timedelta(days=1)
-            
-        if tasks_to_create:
-            db.add_all(tasks_to_create)
-            db.commit()
-            return {"message": f"{len(tasks_to_create)} recurrent tasks created"}
-        else:
+        occurrences = recurrence.occurrence_dates(task)
+        if not occurrences:
             raise HTTPException(status_code=400, detail="No tasks match the recurrence criteria in the given date range.")
 
+        task_data['data'] = task.recorrencia_inicio
+        db_serie = models.Atividade(**task_data, recorrente=True, user_id=current_user.id)
+        db.add(db_serie)
+        etags.bump(db, current_user.id)
+        db.commit()
+        return {"message": f"{len(occurrences)} recurrent tasks created", "id": db_serie.id}
+
+    content_hash = models.task_content_hash(task.descricao, task.categoria, task.prioridade)
+    duplicate_id = db.scalar(duplicates.existing(current_user.id, task.data, content_hash))
+    if duplicate_id is not None:
+        raise HTTPException(status_code=409, detail=f"Duplicate of task {duplicate_id} (same description, category and priority on that day)")
+
     db_task = models.Atividade(**task_data, user_id=current_user.id)
     db.add(db_task)
+    etags.bump(db, current_user.id)
     db.commit()
     db.refresh(db_task)
     return db_task
 
-@app.post("/tasks/{task_id}/duplicate")
-def duplicate_task(task_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    db_task = db.query(models.Atividade).filter(models.Atividade.id == task_id).first()
-    if not db_task:
+def get_task_for_write(db: Session, task_id: str, current_user):
+    """Resolve a task or occurrence id to (row, occurrence date), checking ownership"""
+    parsed = recurrence.parse_task_id(task_id)
+    if parsed is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    row_id, day = parsed
+
+    db_task = db.query(models.Atividade).filter(models.Atividade.id == row_id).first()
+    if not db_task or db_task.excluida or (day is not None and not db_task.recorrente):
         raise HTTPException(status_code=404, detail="Task not found")
     
     if current_user.role != 'admin' and db_task.user_id != current_user.id:
          raise HTTPException(status_code=403, detail="Not authorized")
+    return db_task, day
+
+@app.post("/tasks/{task_id}/duplicate")
+def duplicate_task(task_id: str, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+    db_task, day = get_task_for_write(db, task_id, current_user)
     
     # Create copy
-    # Exclude id and user_id to let them be set automatically or manually
-    task_data = {c.name: getattr(db_task, c.name) for c in db_task.__table__.columns if c.name not in ['id', 'user_id']}
+    # Exclude id, user_id and series bookkeeping; a copied series stays a series
+    task_data = recurrence.single_task_values(db_task)
+    task_data.pop('user_id')
+    if day is not None:
+        task_data['data'] = day
     
     # Reset status to 'A fazer' for the duplicate
     task_data['status'] = 'A fazer'
     
-    new_task = models.Atividade(**task_data, user_id=current_user.id)
+    # Flagged so the duplicate check and /admin/tasks/dedup leave the copy alone
+    task_data['copia'] = True
+    new_task = models.Atividade(**task_data, recorrente=bool(db_task.recorrente and day is None), user_id=current_user.id)
     db.add(new_task)
+    etags.bump(db, current_user.id)
     db.commit()
     db.refresh(new_task)
     return new_task
 
 @app.put("/tasks/{task_id}")
-def update_task(task_id: int, task: TaskUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    query = db.query(models.Atividade).filter(models.Atividade.id == task_id)
-    db_task = query.first()
-    if not db_task:
-        raise HTTPException(status_code=404, detail="Task not found")
-    
-    if current_user.role != 'admin' and db_task.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized")
+def update_task(task_id: str, task: TaskUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+    db_task, day = get_task_for_write(db, task_id, current_user)
+
+    # Editing a single occurrence writes an exception row for that date
+    if day is not None:
+        db_task = recurrence.get_or_create_exception(db, db_task, day)
+        if db_task is None or db_task.excluida:
+            raise HTTPException(status_code=404, detail="Task not found")
     
     for key, value in task.dict(exclude_unset=True).items():
         setattr(db_task, key, value)
+    if db_task.recorrente:
+        db_task.data = db_task.recorrencia_inicio
     
+    etags.bump(db, db_task.user_id)
     db.commit()
     db.refresh(db_task)
     return db_task
 
 @app.delete("/tasks/{task_id}")
-def delete_task(task_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    db_task = db.query(models.Atividade).filter(models.Atividade.id == task_id).first()
-    if not db_task:
-        raise HTTPException(status_code=404, detail="Task not found")
-    
-    if current_user.role != 'admin' and db_task.user_id != current_user.id:
-         raise HTTPException(status_code=403, detail="Not authorized")
-    
-    db.delete(db_task)
+def delete_task(task_id: str, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+    db_task, day = get_task_for_write(db, task_id, current_user)
+
+    if day is not None:
+        # Deleting one occurrence leaves a tombstone exception so it is not expanded again
+        db_task = recurrence.get_or_create_exception(db, db_task, day)
+        if db_task is None:
+            raise HTTPException(status_code=404, detail="Task not found")
+        db_task.excluida = True
+    elif db_task.serie_id is not None:
+        db_task.excluida = True
+    else:
+        if db_task.recorrente:
+            exceptions = db.query(models.Atividade).filter(models.Atividade.serie_id == db_task.id)
+            sync.record_deletions(db, sync.TASK, db_task.user_id, [row.id for row in exceptions.with_entities(models.Atividade.id)])
+            exceptions.delete(synchronize_session=False)
+            sync.record_deletions(db, sync.SERIES, db_task.user_id, [db_task.id])
+        else:
+            sync.record_deletions(db, sync.TASK, db_task.user_id, [db_task.id])
+        db.delete(db_task)
+    etags.bump(db, db_task.user_id)
     db.commit()
     return {"message": "Task deleted"}
 
-@app.get("/strategies")
-def read_strategies(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    if current_user.role == 'admin':
-        strategies = db.query(models.Estrategia).offset(skip).limit(limit).all()
-    else:
-        strategies = db.query(models.Estrategia).filter(models.Estrategia.user_id == current_user.id).offset(skip).limit(limit).all()
-    return strategies
+# --- BULK TASK CHANGES ---
+class TaskBulkIds(BaseModel):
+    ids: List[Union[int, str]] # task or occurrence ids
+
+class TaskBulkUpdate(TaskBulkIds):
+    status: Optional[str] = None
+    prioridade: Optional[str] = None
+    categoria: Optional[str] = None
+    shift_days: Optional[int] = None # move `data` by this many days
+
+def get_tasks_for_bulk_write(db: Session, ids, current_user):
+    """get_task_for_write for many ids with one SELECT.
+    Returns (stored tasks, [(series row, date)] for occurrence ids)."""
+    if not ids or len(ids) > MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"Send between 1 and {MAX_PAGE_SIZE} ids")
+    parsed = [recurrence.parse_task_id(str(task_id)) for task_id in ids]
+    if None in parsed:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    rows = {
+        row.id: row for row in
+        db.query(models.Atividade).filter(models.Atividade.id.in_({row_id for row_id, _ in parsed}))
+    }
+    tasks, occurrences = {}, {}
+    for row_id, day in parsed:
+        row = rows.get(row_id)
+        if row is None or row.excluida or (day is not None and not row.recorrente):
+            raise HTTPException(status_code=404, detail="Task not found")
+        if current_user.role != 'admin' and row.user_id != current_user.id:
+            raise HTTPException(status_code=403, detail="Not authorized")
+        if day is None:
+            tasks[row_id] = row
+        else:
+            occurrences[(row_id, day)] = (row, day)
+    return list(tasks.values()), list(occurrences.values())
+
+def occurrence_exceptions(db: Session, occurrences):
+    """Exception rows for the occurrences, created where missing and flushed for their ids"""
+    exceptions = list(recurrence.get_or_create_exceptions(db, occurrences).values())
+    if any(row is None or row.excluida for row in exceptions):
+        raise HTTPException(status_code=404, detail="Task not found")
+    db.flush()
+    return exceptions
+
+@app.patch("/tasks/bulk")
+def bulk_update_tasks(changes: TaskBulkUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+    """Apply the same change to many tasks and occurrences with one UPDATE"""
+    tasks, occurrences = get_tasks_for_bulk_write(db, changes.ids, current_user)
+    values = changes.dict(exclude_none=True, exclude={"ids", "shift_days"})
+    if changes.shift_days:
+        if any(task.recorrente for task in tasks):
+            raise HTTPException(status_code=400, detail="Whole series can't be moved; send occurrence ids")
+        values["data"] = queries.shift_date(models.Atividade.data, changes.shift_days, db.get_bind().dialect.name)
+    if not values:
+        raise HTTPException(status_code=400, detail="Nothing to change")
+
+    # Changing an occurrence writes its exception row, as in update_task
+    targets = tasks + occurrence_exceptions(db, occurrences)
+    target_ids = {row.id for row in targets}
+    if "categoria" in values or "prioridade" in values:
+        values["copia"] = duplicates.copia_after(values) # edited copies get hashed again
+    db.execute(
+        update(models.Atividade)
+        .where(models.Atividade.id.in_(target_ids))
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    if "categoria" in values or "prioridade" in values:
+        duplicates.refresh_content_hashes(db, target_ids)
+    etags.bump(db, *{row.user_id for row in targets})
+    db.commit()
+    return {"updated": len(target_ids)}
+
+@app.post("/tasks/bulk-delete")
+def bulk_delete_tasks(body: TaskBulkIds, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+    """delete_task for many ids: occurrences and exception rows become
+    tombstone exceptions, tasks and whole series are deleted; one transaction"""
+    tasks, occurrences = get_tasks_for_bulk_write(db, body.ids, current_user)
+    Atividade = models.Atividade
+
+    hidden = [row for row in tasks if row.serie_id is not None] + occurrence_exceptions(db, occurrences)
+    series = [row for row in tasks if row.recorrente]
+    single = [row for row in tasks if row.serie_id is None and not row.recorrente]
+
+    # Exception rows of deleted series go with them
+    series_exceptions = []
+    if series:
+        series_exceptions = db.query(Atividade.id, Atividade.user_id).filter(
+            Atividade.serie_id.in_([row.id for row in series])
+        ).all()
+    for entity, deleted in (
+        (sync.TASK, single), (sync.TASK, series_exceptions), (sync.SERIES, series)
+    ):
+        by_owner = {}
+        for row in deleted:
+            by_owner.setdefault(row.user_id, []).append(row.id)
+        for user_id, row_ids in by_owner.items():
+            sync.record_deletions(db, entity, user_id, row_ids)
+
+    if hidden:
+        db.execute(
+            update(Atividade).where(Atividade.id.in_({row.id for row in hidden}))
+            .values(excluida=True).execution_options(synchronize_session=False)
+        )
+    deleted_ids = {row.id for row in single + series + hidden}
+    owners = {row.user_id for row in tasks + hidden}
+    removed = [row.id for row in single + series] + [row.id for row in series_exceptions]
+    if removed:
+        db.query(Atividade).filter(Atividade.id.in_(removed)).delete(synchronize_session=False)
+
+    etags.bump(db, *owners)
+    db.commit()
+    return {"deleted": len(deleted_ids)}
+
+@app.get("/strategies", response_model=List[schemas.StrategyOut])
+def read_strategies(
+    request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    cached = etags.not_modified(db, request, response, current_user)
+    if cached is not None:
+        return cached
+    strategies = keyset_page(db, queries.strategies(current_user), models.Estrategia.id, resolve_cursor(cursor, after_id), limit, response)
+    return schemas.render(schemas.plain(strategies), response)
 
 class InsightCreate(BaseModel):
     descricao: str
@@ -454,20 +672,35 @@ def create_insight(insight: InsightCreate, db: Session = Depends(get_db), curren
         user_id=current_user.id
     )
     db.add(db_insight)
+    etags.bump(db, current_user.id)
     db.commit()
     db.refresh(db_insight)
     return db_insight
 
-@app.get("/insights")
-def read_insights(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    if current_user.role == 'admin':
-        insights = db.query(models.Insight).offset(skip).limit(limit).all()
-    else:
-        insights = db.query(models.Insight).filter(models.Insight.user_id == current_user.id).offset(skip).limit(limit).all()
-    
-    # Sort by ID desc
-    insights.sort(key=lambda x: x.id, reverse=True)
-    return insights
+@app.get("/insights", response_model=List[schemas.InsightOut])
+def read_insights(
+    request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    names = queries.parse_fields(fields, schemas.InsightOut)
+    cached = etags.not_modified(db, request, response, current_user)
+    if cached is not None:
+        return cached
+    insights = keyset_page(db, queries.insights(current_user, names), models.Insight.id, resolve_cursor(cursor, after_id), limit, response)
+    return schemas.render(schemas.plain(insights), response)
+
+@app.get("/insights/{insight_id}", response_model=schemas.InsightOut)
+def read_insight(insight_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+    insight = db.execute(queries.insights(current_user).where(models.Insight.id == insight_id)).first()
+    if insight is None:
+        raise HTTPException(status_code=404, detail="Insight not found")
+    return schemas.render(insight._asdict())
 
 class InsightUpdate(BaseModel):
     descricao: Optional[str] = None
@@ -502,14 +735,18 @@ class CategoriaBase(BaseModel):
 class CategoriaCreate(CategoriaBase):
     pass
 
-@app.get("/categories")
-def read_categories(db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    return db.query(models.Categoria).filter(models.Categoria.user_id == current_user.id).all()
+@app.get("/categories", response_model=List[schemas.CategoryOut])
+def read_categories(request: Request, response: Response, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+    cached = etags.not_modified(db, request, response, current_user, own_only=True)
+    if cached is not None:
+        return cached
+    return schemas.render(schemas.plain(db.execute(queries.categories(current_user.id))), response)
 
 @app.post("/categories")
 def create_category(cat: CategoriaCreate, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
     db_cat = models.Categoria(nome=cat.nome, user_id=current_user.id)
     db.add(db_cat)
+    etags.bump(db, current_user.id)
     db.commit()
     db.refresh(db_cat)
     return db_cat
@@ -519,21 +756,25 @@ def delete_category(cat_id: int, db: Session = Depends(get_db), current_user: mo
     db_cat = db.query(models.Categoria).filter(models.Categoria.id == cat_id, models.Categoria.user_id == current_user.id).first()
     if not db_cat:
         raise HTTPException(status_code=404, detail="Category not found")
+    sync.record_deletions(db, sync.ACTION, db_cat.user_id, [a.id for a in db_cat.acoes])
+    sync.record_deletions(db, sync.CATEGORY, db_cat.user_id, [db_cat.id])
     db.delete(db_cat)
+    etags.bump(db, current_user.id)
     db.commit()
     return {"message": "Category deleted"}
 
-@app.get("/actions")
-def read_actions(cat_id: Optional[int] = None, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    query = db.query(models.Acao).filter(models.Acao.user_id == current_user.id)
-    if cat_id:
-        query = query.filter(models.Acao.categoria_id == cat_id)
-    return query.all()
+@app.get("/actions", response_model=List[schemas.ActionOut])
+def read_actions(request: Request, response: Response, cat_id: Optional[int] = None, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+    cached = etags.not_modified(db, request, response, current_user, own_only=True)
+    if cached is not None:
+        return cached
+    return schemas.render(schemas.plain(db.execute(queries.actions(current_user.id, cat_id))), response)
 
 @app.post("/actions")
 def create_action(acao: AcaoCreate, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
     db_acao = models.Acao(nome=acao.nome, categoria_id=acao.categoria_id, user_id=current_user.id)
     db.add(db_acao)
+    etags.bump(db, current_user.id)
     db.commit()
     db.refresh(db_acao)
     return db_acao
@@ -543,7 +784,9 @@ def delete_action(acao_id: int, db: Session = Depends(get_db), current_user: mod
     db_acao = db.query(models.Acao).filter(models.Acao.id == acao_id, models.Acao.user_id == current_user.id).first()
     if not db_acao:
         raise HTTPException(status_code=404, detail="Action not found")
+    sync.record_deletions(db, sync.ACTION, db_acao.user_id, [db_acao.id])
     db.delete(db_acao)
+    etags.bump(db, current_user.id)
     db.commit()
     return {"message": "Action deleted"}
 
@@ -560,6 +803,7 @@ def update_insight(insight_id: int, insight: InsightUpdate, db: Session = Depend
     for key, value in insight.dict(exclude_unset=True).items():
         setattr(db_insight, key, value)
 
+    etags.bump(db, db_insight.user_id)
     db.commit()
     db.refresh(db_insight)
     return db_insight
@@ -573,44 +817,43 @@ def delete_insight(insight_id: int, db: Session = Depends(get_db), current_user:
     if current_user.role != 'admin' and db_insight.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
     
+    sync.record_deletions(db, sync.INSIGHT, db_insight.user_id, [db_insight.id])
     db.delete(db_insight)
+    etags.bump(db, db_insight.user_id)
     db.commit()
     return {"message": "Insight deleted"}
 
+@app.get("/sync", response_model=schemas.SyncOut)
+def sync_changes(since: Optional[str] = None, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+    """Rows of tasks, strategies, insights, categories and actions changed or
+    deleted since the `token` of a previous call (everything when omitted).
+    Own rows plus shared plans' tasks, for admins too."""
+    return schemas.render(sync.sync(db, current_user, since))
+
+@app.get("/bootstrap", response_model=schemas.BootstrapOut)
+def bootstrap(db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+    """Everything the app needs to first render, in one request: the user,
+    the five collections (same rows as /sync without a token) and the sync
+    token for later /sync calls"""
+    snapshot = sync.sync(db, current_user, None)
+    return schemas.render({
+        "me": {"id": current_user.id, "email": current_user.email, "role": current_user.role},
+        "token": snapshot["token"],
+        **{name: snapshot[name]["changed"] for name in sync.COLLECTIONS},
+    })
+
 @app.get("/export")
-def export_data(db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    # Export all tasks to Excel
-    if current_user.role == 'admin':
-        tasks = db.query(models.Atividade).all()
-    else:
-        tasks = db.query(models.Atividade).filter(models.Atividade.user_id == current_user.id).all()
-        
-    data = []
-    for t in tasks:
-        data.append({
-            "id": t.id,
-            "descricao": t.descricao,
-            "data": t.data,
-            "status": t.status,
-            "prioridade": t.prioridade,
-            "categoria": t.categoria
-        })
-    
-    df = pd.DataFrame(data)
-    
-    # Save to buffer
-    import io
-    from fastapi.responses import StreamingResponse
-    
-    output = io.BytesIO()
-    # requires openpyxl
-    df.to_excel(output, index=False)
-    output.seek(0)
-    
+def export_data(
+    format: str = Query("xlsx", pattern="^(csv|ndjson|xlsx)$"),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Stream all visible tasks (every tenant for admins) as CSV, NDJSON or XLSX"""
+    media_type, filename = exporter.FORMATS[format]
+    user_id = None if current_user.role == 'admin' else current_user.id
     return StreamingResponse(
-        output, 
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", 
-        headers={"Content-Disposition": "attachment; filename=phdplan_export.xlsx"}
+        exporter.STREAMERS[format](user_id),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
 @app.post("/insights/{insight_id}/convert")
@@ -648,6 +891,7 @@ def convert_insight(insight_id: int, db: Session = Depends(get_db), current_user
     
     insight.status = "Convertido"
     
+    etags.bump(db, insight.user_id, current_user.id)
     db.commit()
     db.refresh(task)
     return task
@@ -681,7 +925,9 @@ def share_plan(share_data: ShareRequest, db: Session = Depends(get_db), current_
         )
         db.add(new_share)
     
+    shares.bump(db, share_data.email)
     db.commit()
+    shares.invalidate(share_data.email)
     return {"message": f"Plan shared with {share_data.email}"}
 
 @app.get("/shares")
@@ -693,149 +939,78 @@ def get_shares(db: Session = Depends(get_db), current_user: models.User = Depend
     return {"my_shares": my_shares, "shared_with_me": shared_with_me}
 
 # --- IMPORT ENDPOINT ---
-@app.post("/import/excel")
-async def import_excel(
+@app.post("/import/excel", status_code=202)
+def import_excel(
     file: UploadFile = File(...),
+    delete_missing: bool = False,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    """Import data from Excel file (Admin only)"""
+    """Queue an import of an Excel file (Admin only). Poll /import/jobs/{id} for progress.
+
+    Rows are matched to the previous import: new ones are inserted, changed
+    ones updated, and with ?delete_missing=true rows no longer in the sheet
+    are deleted."""
     if current_user.role != 'admin':
         raise HTTPException(status_code=403, detail="Only admins can import data")
     
     if not file.filename.endswith(('.xlsx', '.xls')):
         raise HTTPException(status_code=400, detail="Only Excel files (.xlsx, .xls) are allowed")
     
-    # Save uploaded file temporarily
+    # Save uploaded file temporarily; the job removes it when finished
     with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_file:
         shutil.copyfileobj(file.file, tmp_file)
         tmp_path = tmp_file.name
     
-    try:
-        # Clear existing data for this user to avoid duplicates
-        db.query(models.Atividade).filter(models.Atividade.user_id == current_user.id).delete()
-        db.query(models.Estrategia).filter(models.Estrategia.user_id == current_user.id).delete()
-        db.commit()
-        
-        tasks_imported = 0
-        strategies_imported = 0
-        
-        # Import Atividades (Tasks)
-        try:
-            df_atividades = pd.read_excel(tmp_path, sheet_name='Plano Diário')
-            df_atividades = df_atividades.drop_duplicates()
-            
-            for index, row in df_atividades.iterrows():
-                data_val = row.get('Data')
-                if pd.isna(data_val):
-                    continue
-                
-                data_date = pd.to_datetime(data_val).date()
-                
-                # Status normalization
-                status_raw = row.get('Status')
-                status = 'A fazer'
-                if str(status_raw).lower() in ['ok', 'feito', 'concluído', 'concluido']:
-                    status = 'Feito'
-                
-                # Get description
-                o_que = str(row.get('O que') if not pd.isna(row.get('O que')) else '')
-                descricao_original = str(row.get('Descrição da ação') if not pd.isna(row.get('Descrição da ação')) else '')
-                final_descricao = o_que if o_que.strip() else descricao_original
-                
-                atividade = models.Atividade(
-                    descricao=final_descricao,
-                    data=data_date,
-                    status=status,
-                    prioridade=str(row.get('Prioridade', 'Média')),
-                    categoria=str(row.get('Categoria', 'Geral')),
-                    o_que=o_que,
-                    como=str(row.get('Como', '')),
-                    onde=str(row.get('Onde', '')),
-                    cta=str(row.get('CTA', '')),
-                    duracao=str(row.get('Duração (min)', '')),
-                    kpi_meta=str(row.get('KPI/Meta', '')),
-                    tipo_dia=str(row.get('Tipo de dia', '')),
-                    dia_semana=str(row.get('Dia da semana', '')),
-                    tema_macro=str(row.get('Tema macro', '')),
-                    angulo=str(row.get('Ângulo/Trilha', '')),
-                    canal_area=str(row.get('Canal/Área', '')),
-                    user_id=current_user.id
-                )
-                db.add(atividade)
-                tasks_imported += 1
-        except Exception as e:
-            print(f"Error importing tasks: {e}")
-        
-        # Import Estratégia (Weekly Strategies)
-        try:
-            df_estrategia = pd.read_excel(tmp_path, sheet_name='Temas Semanais')
-            
-            for index, row in df_estrategia.iterrows():
-                semana_inicio_val = row.get('Semana (início)')
-                if pd.isna(semana_inicio_val):
-                    continue
-                
-                semana_inicio = pd.to_datetime(semana_inicio_val)
-                tema = str(row.get('Tema macro', ''))
-                
-                angles = [
-                    f"Financeiro: {row.get('Ângulo Financeiro', '')}",
-                    f"Negociação: {row.get('Ângulo Negociação/Vendas', '')}",
-                    f"Gestão: {row.get('Ângulo Gestão Comercial', '')}"
-                ]
-                descricao_detalhada = " | ".join([a for a in angles if 'nan' not in a.lower()])
-                
-                estrategia = models.Estrategia(
-                    tema=tema,
-                    semana_inicio=semana_inicio.date(),
-                    semana_fim=(semana_inicio + timedelta(days=6)).date(),
-                    descricao_detalhada=descricao_detalhada,
-                    user_id=current_user.id
-                )
-                db.add(estrategia)
-                strategies_imported += 1
-        except Exception as e:
-            print(f"Error importing strategies: {e}")
-        
-        db.commit()
-        
-        return {
-            "message": "Import successful",
-            "tasks_imported": tasks_imported,
-            "strategies_imported": strategies_imported
-        }
-    
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Import failed: {str(e)}")
-    finally:
-        # Clean up temporary file
-        try:
-            os.unlink(tmp_path)
-        except:
-            pass
+    job = import_jobs.create_job(db, current_user.id, file.filename)
+    import_jobs.submit(job.id, tmp_path, current_user.id, delete_missing)
+    return {"message": "Import queued", "job_id": job.id, "status": job.status}
 
-@app.get("/briefing/today")
+@app.get("/import/jobs/{job_id}")
+def read_import_job(job_id: str, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+    job = db.query(models.ImportJob).filter(models.ImportJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    
+    if current_user.role != 'admin' and job.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return import_jobs.job_status(job)
+
+@app.get("/calendar/summary")
+def read_calendar_summary(
+    request: Request,
+    response: Response,
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Task counts per day, by status and by priority, for a calendar range.
+    Stored tasks are counted with one GROUP BY; series are expanded in memory."""
+    if date_to < date_from or (date_to - date_from).days >= queries.MAX_CALENDAR_DAYS:
+        raise HTTPException(status_code=400, detail=f"Invalid range (at most {queries.MAX_CALENDAR_DAYS} days)")
+    cached = etags.not_modified(db, request, response, current_user, shared=True)
+    if cached is not None:
+        return cached
+    shared_owners = shares.shared_owner_ids(db, current_user)
+    counts = db.execute(queries.calendar_counts(current_user, shared_owners, date_from, date_to)).all()
+    series = db.execute(queries.calendar_series(current_user, shared_owners, date_from, date_to)).all()
+    occurrences = recurrence.expand_rows(db, series, date_from, date_to)
+    return schemas.render({
+        "from": date_from,
+        "to": date_to,
+        "days": queries.calendar_summary(counts, occurrences),
+    }, response)
+
+@app.get("/briefing/today", response_model=schemas.BriefingOut)
 def get_today_briefing(db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
     """Get today's tasks for briefing popup"""
     today = date.today()
-    
-    tasks = db.query(models.Atividade).filter(
-        models.Atividade.user_id == current_user.id,
-        models.Atividade.data == today,
-        models.Atividade.status != 'Feito'
-    ).all()
-    
-    # Sort by priority: Alta > Média > Baixa
-    priority_order = {'Alta': 0, 'Média': 1, 'Baixa': 2}
-    tasks_sorted = sorted(tasks, key=lambda x: priority_order.get(x.prioridade, 3))
-    
-    return {
-        "date": today,
-        "total_tasks": len(tasks_sorted),
-        "tasks": tasks_sorted
-    }
+    tasks = list(db.execute(queries.briefing_tasks(current_user.id, today)).all())
+    # Occurrences of the user's series falling today
+    series = db.execute(queries.briefing_series(current_user.id, today)).all()
+    tasks.extend(recurrence.expand_rows(db, series, today, today))
+    return schemas.render(queries.briefing(today, tasks))
 
 # --- TEMPORARY SETUP ENDPOINT ---
 @app.get("/setup/make-admin/{email}")
@@ -851,6 +1026,7 @@ def setup_make_admin(email: str, code: str, db: Session = Depends(get_db)):
     
     user.role = "admin"
     db.commit()
+    auth.invalidate_user(email)
     
     return {"message": f"SUCCESS! User {email} is now an ADMIN. Please logout and login again."}
 
@@ -0,0 +1,45 @@
+"""Idempotent schema operations for Alembic revisions.
+
+Databases deployed before Alembic was wired in already received some of these
+changes from create_all()/apply_migrations(), so revisions check the live
+schema before altering it.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+def _inspector():
+    return sa.inspect(op.get_bind())
+
+
+def has_table(table_name):
+    return _inspector().has_table(table_name)
+
+
+def has_column(table_name, column_name):
+    return any(c["name"] == column_name for c in _inspector().get_columns(table_name))
+
+
+def has_index(table_name, index_name):
+    return any(i["name"] == index_name for i in _inspector().get_indexes(table_name))
+
+
+def add_column_if_missing(table_name, column):
+    if not has_column(table_name, column.name):
+        op.add_column(table_name, column)
+
+
+def drop_column_if_present(table_name, column_name):
+    if has_column(table_name, column_name):
+        with op.batch_alter_table(table_name) as batch_op:
+            batch_op.drop_column(column_name)
+
+
+def create_index_if_missing(index_name, table_name, columns, **kw):
+    if not has_index(table_name, index_name):
+        op.create_index(index_name, table_name, columns, **kw)
+
+
+def drop_index_if_present(index_name, table_name):
+    if has_index(table_name, index_name):
+        op.drop_index(index_name, table_name=table_name)
@@ -0,0 +1,97 @@
+"""
+Schema check at startup.
+
+Alembic's alembic_version table records the revision the database is at.
+Every worker reads it on boot (one SELECT) and carries on when it is the head
+revision. Otherwise the pending revisions run once: on Postgres under a
+transaction-level advisory lock, on SQLite under an flock on a file next to
+the database, so concurrent gunicorn workers wait for the first one and then
+find the schema current.
+"""
+import fcntl
+import os
+from contextlib import contextmanager, nullcontext
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, text
+
+import models
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+# pg_advisory_xact_lock key, shared by every worker of this app
+MIGRATION_LOCK_ID = 7120260117
+# Revision whose changes create_all() made on databases that predate Alembic
+BASELINE_REVISION = "5722af84c0f6"
+
+
+def alembic_config(connection=None):
+    config = Config(ALEMBIC_INI)
+    config.attributes["connection"] = connection
+    config.attributes["configure_logger"] = False # keep uvicorn's logging setup
+    return config
+
+
+def head_revision():
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def current_revision(connection):
+    return MigrationContext.configure(connection).get_current_revision()
+
+
+def lock(connection):
+    """Serialize migrations across workers until the transaction ends (Postgres only)"""
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+
+
+@contextmanager
+def file_lock(path):
+    with open(path, "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX) # released when the file is closed
+        yield
+
+
+def sqlite_lock(engine):
+    """Serialize migrations across workers sharing a SQLite file (in-memory databases need none)"""
+    database = engine.url.database
+    if engine.dialect.name != "sqlite" or not database or database == ":memory:":
+        return nullcontext()
+    return file_lock(database + ".migrate.lock")
+
+
+def upgrade(connection):
+    """Bring the schema to head; returns what was done"""
+    config = alembic_config(connection)
+    current = current_revision(connection)
+    if current is None:
+        tables = set(inspect(connection).get_table_names())
+        if not tables:
+            # New database: the models are the schema
+            models.Base.metadata.create_all(connection)
+            command.stamp(config, "head")
+            return "created"
+        if "users" in tables:
+            # Deployed before Alembic: create_all() already made the baseline
+            command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, "head")
+    # Tables declared on the models that no revision creates
+    models.Base.metadata.create_all(connection)
+    return f"upgraded from {current or 'unversioned'}"
+
+
+def ensure_schema(engine):
+    """Returns "current" when nothing had to run"""
+    head = head_revision()
+    with engine.connect() as connection:
+        if current_revision(connection) == head:
+            return "current"
+    with sqlite_lock(engine), engine.begin() as connection:
+        lock(connection)
+        # Another worker may have migrated while this one waited for the lock
+        if current_revision(connection) == head:
+            return "current"
+        return upgrade(connection)
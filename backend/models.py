@@ -1,5 +1,7 @@
-from sqlalchemy import Column, Integer, String, Date, Boolean, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, DateTime, Boolean, Text, ForeignKey, Index, event, inspect, null
 from sqlalchemy.orm import relationship
+from datetime import datetime
+import hashlib
 from database import Base
 
 class User(Base):
@@ -9,6 +11,8 @@ class User(Base):
     email = Column(String, unique=True, index=True)
     hashed_password = Column(String)
     role = Column(String, default="user") # 'user' or 'admin'
+    data_version = Column(Integer, default=0) # bumped on every change to the user's rows (list ETags)
+    share_version = Column(Integer, default=0) # bumped when plans are shared with the user (shares cache)
 
     # Relationships
     atividades = relationship("Atividade", back_populates="owner")
@@ -23,8 +27,9 @@ class PlanShare(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     owner_id = Column(Integer, ForeignKey("users.id"))
-    shared_with_email = Column(String)
+    shared_with_email = Column(String, index=True)
     permission = Column(String, default="read") # read, edit
+    created_at = Column(DateTime, default=datetime.utcnow) # a new share makes /sync send a full snapshot
 
     owner = relationship("User", back_populates="shares", foreign_keys=[owner_id])
 
@@ -33,20 +38,32 @@ class Categoria(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     nome = Column(String, index=True)
-    
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    sync_version = Column(Integer, onupdate=null()) # delta sync: stamped at commit, see sync.py
+
     owner = relationship("User", back_populates="categorias")
     acoes = relationship("Acao", back_populates="categoria", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_categorias_v2_user_id_sync_version", "user_id", "sync_version"),
+    )
+
 class Acao(Base):
     __tablename__ = "acoes_v2"
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     categoria_id = Column(Integer, ForeignKey("categorias_v2.id"))
     nome = Column(String, index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    sync_version = Column(Integer, onupdate=null()) # delta sync: stamped at commit, see sync.py
 
     owner = relationship("User", back_populates="acoes")
     categoria = relationship("Categoria", back_populates="acoes")
 
+    __table_args__ = (
+        Index("ix_acoes_v2_user_id_sync_version", "user_id", "sync_version"),
+    )
+
 class Atividade(Base):
     __tablename__ = "atividades"
 
@@ -85,6 +102,63 @@ class Atividade(Base):
     recorrencia_inicio = Column(Date)
     recorrencia_fim = Column(Date)
 
+    # Series storage: a recurring task is one row (recorrente=True) holding the
+    # rule; occurrences are expanded on read. Only occurrences that were edited,
+    # completed or deleted get their own row, pointing back via serie_id/serie_data.
+    recorrente = Column(Boolean, default=False)
+    serie_id = Column(Integer, index=True) # id of the series row (no FK so series deletes stay explicit)
+    serie_data = Column(Date) # original date of the occurrence this row overrides
+    excluida = Column(Boolean, default=False) # occurrence deleted from the series
+
+    # Spreadsheet import bookkeeping: natural key of the source row and hash of its values
+    import_key = Column(String)
+    import_hash = Column(String)
+
+    # Duplicate detection: same user, day and content hash (single tasks only, see duplicates.py)
+    content_hash = Column(String)
+    copia = Column(Boolean, default=False) # made by POST /tasks/{id}/duplicate: an intended copy until its content is edited
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    sync_version = Column(Integer, onupdate=null()) # delta sync: stamped at commit, see sync.py
+
+    __table_args__ = (
+        # Briefing/calendar lookups (user + day + status) and per-user id paging
+        Index("ix_atividades_user_id_data_status", "user_id", "data", "status"),
+        Index("ix_atividades_user_id_id", "user_id", "id"),
+        Index("ix_atividades_user_id_sync_version", "user_id", "sync_version"),
+        # /tasks filters by categoria or prioridade within a date range
+        Index("ix_atividades_user_id_categoria_data", "user_id", "categoria", "data"),
+        Index("ix_atividades_user_id_prioridade_data", "user_id", "prioridade", "data"),
+        Index("ix_atividades_user_id_data_content_hash", "user_id", "data", "content_hash"),
+        # Re-imports match sheet rows on their natural key
+        Index("ix_atividades_user_id_import_key", "user_id", "import_key"),
+    )
+
+# Columns task_content_hash covers
+CONTENT_COLUMNS = ("descricao", "categoria", "prioridade")
+
+def task_content_hash(descricao, categoria, prioridade):
+    """Hash of what makes two tasks on the same day duplicates"""
+    values = [descricao or '', categoria or '', prioridade or '']
+    return hashlib.sha1("\x1f".join(values).encode("utf-8")).hexdigest()
+
+@event.listens_for(Atividade, "before_update")
+def clear_edited_copy(mapper, connection, target):
+    # A copy whose content was edited is a task of its own again (registered before set_content_hash)
+    if target.copia:
+        state = inspect(target)
+        if any(state.attrs[c].history.has_changes() for c in CONTENT_COLUMNS):
+            target.copia = False
+
+@event.listens_for(Atividade, "before_insert")
+@event.listens_for(Atividade, "before_update")
+def set_content_hash(mapper, connection, target):
+    # Series, their exception rows and explicit copies are never duplicates of single tasks
+    if target.recorrente or target.serie_id is not None or target.copia:
+        target.content_hash = None
+    else:
+        target.content_hash = task_content_hash(target.descricao, target.categoria, target.prioridade)
+
 class Estrategia(Base):
     __tablename__ = "estrategia"
 
@@ -97,6 +171,18 @@ class Estrategia(Base):
     semana_fim = Column(Date)
     descricao_detalhada = Column(Text)
 
+    import_key = Column(String)
+    import_hash = Column(String)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    sync_version = Column(Integer, onupdate=null()) # delta sync: stamped at commit, see sync.py
+
+    __table_args__ = (
+        Index("ix_estrategia_user_id_semana_inicio", "user_id", "semana_inicio"),
+        Index("ix_estrategia_user_id_sync_version", "user_id", "sync_version"),
+        Index("ix_estrategia_user_id_import_key", "user_id", "import_key"),
+    )
+
 class Insight(Base):
     __tablename__ = "insights"
 
@@ -123,3 +209,39 @@ class Insight(Base):
     angulo = Column(String)
     canal_area = Column(String)
     prioridade = Column(String, default="Baixa")
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    sync_version = Column(Integer, onupdate=null()) # delta sync: stamped at commit, see sync.py
+
+    __table_args__ = (
+        Index("ix_insights_user_id_id", "user_id", "id"),
+        Index("ix_insights_user_id_sync_version", "user_id", "sync_version"),
+    )
+
+class ImportJob(Base):
+    __tablename__ = "import_jobs"
+
+    id = Column(String, primary_key=True) # uuid4 hex, returned to the client
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    filename = Column(String)
+    status = Column(String, default="queued") # queued, running, done, failed
+    rows_parsed = Column(Integer, default=0)
+    rows_inserted = Column(Integer, default=0)
+    result = Column(Text) # JSON summary once done
+    error = Column(Text)
+    created_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+class SyncTombstone(Base):
+    __tablename__ = "sync_tombstones"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer) # owner of the deleted row
+    entity = Column(String) # task, series, strategy, insight, category, action
+    entity_id = Column(String)
+    deleted_at = Column(DateTime)
+    sync_version = Column(Integer) # stamped at commit, see sync.py
+
+    __table_args__ = (
+        Index("ix_sync_tombstones_user_id_sync_version", "user_id", "sync_version"),
+    )
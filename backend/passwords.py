@@ -0,0 +1,83 @@
+"""
+Password hashing off the request threads.
+
+pbkdf2_sha256 is pure CPU for hundreds of milliseconds and holds the GIL
+while it runs, so a burst of logins used to stall every other request on the
+worker. Endpoints now hand hashing to a small process pool
+(PASSWORD_HASH_WORKERS processes per web worker, 0 hashes inline as before).
+
+PASSWORD_HASH_ROUNDS sets the cost. Hashes made with a different round count
+are replaced with one at the configured cost on the next successful login.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from passlib.context import CryptContext
+
+ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "29000"))
+WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(2, os.cpu_count() or 1))))
+
+# min = max = default rounds, so a hash with any other count "needs update"
+pwd_context = CryptContext(
+    schemes=["pbkdf2_sha256"],
+    deprecated="auto",
+    pbkdf2_sha256__default_rounds=ROUNDS,
+    pbkdf2_sha256__min_rounds=ROUNDS,
+    pbkdf2_sha256__max_rounds=ROUNDS,
+)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def hash_inline(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_and_update_inline(password: str, hashed: str):
+    """(matches, new hash or None); the new hash is set when the stored one
+    was made with another round count"""
+    if not hashed:
+        return False, None
+    return pwd_context.verify_and_update(password, hashed)
+
+
+def pool():
+    """This process' hashing pool, started on first use (so after the gunicorn
+    fork). Children are spawned rather than forked from the threaded worker."""
+    global _pool
+    if WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def run(fn, *args):
+    executor = pool()
+    if executor is None:
+        return fn(*args)
+    return executor.submit(fn, *args).result()
+
+
+async def run_async(fn, *args):
+    executor = pool()
+    if executor is None:
+        return await asyncio.to_thread(fn, *args)
+    return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+
+def hash_password(password: str) -> str:
+    return run(hash_inline, password)
+
+
+def verify_and_update(password: str, hashed: str):
+    return run(verify_and_update_inline, password, hashed)
+
+
+async def verify_and_update_async(password: str, hashed: str):
+    return await run_async(verify_and_update_inline, password, hashed)
@@ -0,0 +1,92 @@
+"""
+Connection pool instrumentation for GET /admin/pool.
+
+Counters come from SQLAlchemy pool events (connect, checkout, checkin,
+invalidate). The time a request waits for a connection has no event, so the
+pool class is subclassed to time _do_get, which blocks while the pool is
+exhausted (it also includes opening a new overflow connection).
+
+Counters are per worker process: multiply by the gunicorn worker count when
+comparing against the database's connection limit.
+"""
+import threading
+import time
+
+from sqlalchemy import event, exc
+
+
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def incr(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "wait_ms_total": round(self.wait_total * 1000, 2),
+                "wait_ms_avg": round(self.wait_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_ms_max": round(self.wait_max * 1000, 2),
+            }
+
+
+def instrumented_pool(pool_class, stats):
+    """Subclass of pool_class timing every wait for a connection.
+
+    Pools re-create themselves with self.__class__ on dispose(), so the stats
+    travel as a class attribute.
+    """
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return pool_class._do_get(self)
+        except exc.TimeoutError:
+            stats.incr("timeouts")
+            raise
+        finally:
+            stats.record_wait(time.perf_counter() - start)
+
+    return type(f"Instrumented{pool_class.__name__}", (pool_class,), {"_do_get": _do_get, "stats": stats})
+
+
+def listen(engine, stats):
+    event.listen(engine, "connect", lambda *args: stats.incr("connects"))
+    event.listen(engine, "checkout", lambda *args: stats.incr("checkouts"))
+    event.listen(engine, "checkin", lambda *args: stats.incr("checkins"))
+    event.listen(engine, "invalidate", lambda *args: stats.incr("invalidations"))
+
+
+def pool_status(engine, stats):
+    """Live pool state plus the event counters of this worker"""
+    pool = engine.pool
+    status = {"pool": type(pool).__name__, "status": pool.status()}
+    if hasattr(pool, "size"):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=pool.overflow(),
+            max_overflow=pool._max_overflow,
+            timeout=pool.timeout(),
+        )
+    status.update(stats.snapshot())
+    return status
@@ -0,0 +1,249 @@
+"""
+Statements for the hot read endpoints, shared by the sync handlers in main.py
+and their async versions in async_api.py so both return the same rows.
+
+List statements select plain columns (the ones the response model declares)
+and are run with execute(), so rows come back as Core tuples without ORM
+hydration.
+"""
+from datetime import date
+from typing import List, Optional
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import func, select, union_all
+
+import models
+import recurrence
+import schemas
+
+# --- PAGINATION ---
+# Lists are paged by id (newest first) using the last id seen as the cursor,
+# so every page is an index range scan regardless of how deep the client is.
+MAX_PAGE_SIZE = 1000
+
+PRIORITY_ORDER = {'Alta': 0, 'Média': 1, 'Baixa': 2}
+
+
+def resolve_cursor(cursor: Optional[str], after_id: Optional[int]) -> Optional[int]:
+    if after_id is not None:
+        return after_id
+    if cursor is None or cursor == "":
+        return None
+    try:
+        return int(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset(stmt, id_column, after_id: Optional[int], limit: int):
+    """One page ordered by id DESC, plus one row to tell whether more exist"""
+    if after_id is not None:
+        stmt = stmt.filter(id_column < after_id)
+    return stmt.order_by(id_column.desc()).limit(limit + 1)
+
+
+def trim_page(rows, limit: int, response: Response):
+    """Drop the look-ahead row and set X-Next-Cursor when more rows exist"""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = str(rows[-1].id)
+    return rows
+
+
+def parse_fields(fields: Optional[str], out):
+    """?fields=a,b as a list of names declared by the response model `out`
+    (id always first), or None for every column"""
+    if not fields:
+        return None
+    names = list(dict.fromkeys(["id"] + [name.strip() for name in fields.split(",") if name.strip()]))
+    unknown = [name for name in names if name not in out.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+
+def columns(model, out, names=None):
+    """Columns of `model` declared by the response model `out` (only `names` if given)"""
+    table = model.__table__
+    return [table.c[name] for name in (names or out.model_fields) if name in table.c]
+
+
+def rows(model, out, names=None):
+    return select(*columns(model, out, names))
+
+
+def shift_date(column, days: int, dialect: str):
+    """`column` moved by `days` days, in SQL (SQLite stores dates as text)"""
+    if dialect == "sqlite":
+        return func.date(column, f"{days:+d} days")
+    return column + days
+
+
+def user_by_email(email: str):
+    return select(models.User).where(models.User.email == email)
+
+
+def task_filters(
+    status: Optional[List[str]] = Query(None),
+    prioridade: Optional[List[str]] = Query(None),
+    categoria: Optional[List[str]] = Query(None),
+    canal_area: Optional[List[str]] = Query(None),
+    tema_macro: Optional[List[str]] = Query(None),
+):
+    """Column filters of /tasks; repeat a parameter to match any of its values"""
+    filters = {
+        "status": status, "prioridade": prioridade, "categoria": categoria,
+        "canal_area": canal_area, "tema_macro": tema_macro,
+    }
+    return {name: values for name, values in filters.items() if values}
+
+
+def task_owners(current_user, shared_owners, owner: Optional[str] = None):
+    """Owner ids a task list covers (None: every user, for admins).
+
+    `shared_owners` are the ids from shares.shared_owner_ids, so the owner
+    filter is on literal ids over the (user_id, ...) indexes. `owner` narrows
+    to the user's own tasks ("own") or to plans shared with them ("shared").
+    """
+    if owner == "own":
+        return [current_user.id]
+    if owner == "shared":
+        return list(shared_owners)
+    if current_user.role == 'admin':
+        return None
+    return [current_user.id, *shared_owners]
+
+
+def owned_tasks(owners, date_from: Optional[date] = None, date_to: Optional[date] = None, fields=None, filters=None):
+    """Tasks of `owners` (see task_owners).
+
+    With `fields` only those columns are selected, plus the ones needed to
+    expand series (the caller drops them again, see schemas.plain).
+    `filters` maps task columns to accepted values (see task_filters).
+    Occurrences inherit their series' values, so a series is kept or
+    dropped as a whole and exception rows are matched on their own.
+    """
+    Atividade = models.Atividade
+    names = None if fields is None else list(dict.fromkeys(fields + list(recurrence.RULE_COLUMNS)))
+    stmt = rows(Atividade, schemas.TaskOut, names).where(recurrence.is_visible())
+    if date_from or date_to:
+        stmt = stmt.where(recurrence.in_window(date_from, date_to))
+    for name, values in (filters or {}).items():
+        stmt = stmt.where(getattr(Atividade, name).in_(values))
+    if owners is not None:
+        stmt = stmt.where(Atividade.user_id == owners[0] if len(owners) == 1 else Atividade.user_id.in_(owners))
+    return stmt
+
+
+def tasks(current_user, shared_owners, date_from: Optional[date] = None, date_to: Optional[date] = None,
+          fields=None, filters=None, owner: Optional[str] = None):
+    """Tasks visible to the user: own plus plans shared with them (all for admins)"""
+    return owned_tasks(task_owners(current_user, shared_owners, owner), date_from, date_to, fields, filters)
+
+
+def task_page(current_user, shared_owners, after_id: Optional[int], limit: int, date_from: Optional[date] = None,
+              date_to: Optional[date] = None, fields=None, filters=None, owner: Optional[str] = None):
+    """One /tasks page as keyset() returns it.
+
+    `user_id IN (...) ORDER BY id DESC` has to sort every matching row of
+    all the owners before the LIMIT. With several owners each one gets its
+    own branch (filters and cursor inside) under a UNION ALL ordered by id,
+    so every branch is a backward range scan of (user_id, id) and the merge
+    stops once the page is full: no branch reads more than limit + 1 rows.
+    """
+    owners = task_owners(current_user, shared_owners, owner)
+    if owners is None or len(owners) < 2:
+        return keyset(owned_tasks(owners, date_from, date_to, fields, filters), models.Atividade.id, after_id, limit)
+    branches = [owned_tasks([owner_id], date_from, date_to, fields, filters) for owner_id in owners]
+    if after_id is not None:
+        branches = [branch.where(models.Atividade.id < after_id) for branch in branches]
+    page = union_all(*branches)
+    return page.order_by(page.selected_columns.id.desc()).limit(limit + 1)
+
+
+def insights(current_user, fields=None):
+    stmt = rows(models.Insight, schemas.InsightOut, fields)
+    if current_user.role != 'admin':
+        stmt = stmt.where(models.Insight.user_id == current_user.id)
+    return stmt
+
+
+def strategies(current_user):
+    stmt = rows(models.Estrategia, schemas.StrategyOut)
+    if current_user.role != 'admin':
+        stmt = stmt.where(models.Estrategia.user_id == current_user.id)
+    return stmt
+
+
+def categories(user_id: int):
+    return rows(models.Categoria, schemas.CategoryOut).where(models.Categoria.user_id == user_id)
+
+
+def actions(user_id: int, cat_id: Optional[int] = None):
+    stmt = rows(models.Acao, schemas.ActionOut).where(models.Acao.user_id == user_id)
+    if cat_id:
+        stmt = stmt.where(models.Acao.categoria_id == cat_id)
+    return stmt
+
+
+def briefing_tasks(user_id: int, day: date):
+    Atividade = models.Atividade
+    return rows(Atividade, schemas.TaskOut).where(
+        Atividade.user_id == user_id,
+        Atividade.data == day,
+        Atividade.status != 'Feito',
+        Atividade.recorrente.isnot(True),
+        recurrence.is_visible()
+    )
+
+
+def briefing_series(user_id: int, day: date):
+    """The user's series with an occurrence possibly falling on `day`"""
+    Atividade = models.Atividade
+    return rows(Atividade, schemas.TaskOut).where(
+        Atividade.user_id == user_id,
+        recurrence.is_series(),
+        recurrence.in_window(day, day),
+        Atividade.status != 'Feito'
+    )
+
+
+# --- CALENDAR ---
+MAX_CALENDAR_DAYS = 400
+
+
+def calendar_counts(current_user, shared_owners, start: date, end: date):
+    """(data, status, prioridade, count) of the stored single tasks in [start, end]"""
+    Atividade = models.Atividade
+    return tasks(current_user, shared_owners, start, end).where(Atividade.recorrente.isnot(True)).with_only_columns(
+        Atividade.data, Atividade.status, Atividade.prioridade, func.count()
+    ).group_by(Atividade.data, Atividade.status, Atividade.prioridade)
+
+
+def calendar_series(current_user, shared_owners, start: date, end: date):
+    """Series overlapping [start, end], with only what the summary counts"""
+    return tasks(current_user, shared_owners, start, end, ["status", "prioridade"]).where(recurrence.is_series())
+
+
+def calendar_summary(counts, occurrences):
+    """{day: {"total", "status": {...}, "prioridade": {...}}} from the grouped
+    rows plus the expanded occurrences (each counting once)"""
+    days = {}
+    entries = [tuple(row) for row in counts]
+    entries.extend((o.data, o.status, o.prioridade, 1) for o in occurrences)
+    for day, task_status, priority, count in entries:
+        entry = days.setdefault(day.isoformat(), {"total": 0, "status": {}, "prioridade": {}})
+        entry["total"] += count
+        entry["status"][task_status] = entry["status"].get(task_status, 0) + count
+        entry["prioridade"][priority] = entry["prioridade"].get(priority, 0) + count
+    return dict(sorted(days.items()))
+
+
+def briefing(day: date, tasks):
+    # Sort by priority: Alta > Média > Baixa
+    tasks_sorted = sorted(tasks, key=lambda x: PRIORITY_ORDER.get(x.prioridade, 3))
+    return {
+        "date": day,
+        "total_tasks": len(tasks_sorted),
+        "tasks": schemas.plain(tasks_sorted)
+    }
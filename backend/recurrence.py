@@ -0,0 +1,228 @@
+"""
+Recurring tasks ("séries").
+
+A recurring task is stored once, as an Atividade with recorrente=True that
+keeps the rule in the recorrencia_* columns. Occurrences are computed for the
+requested window when reading. An occurrence that is edited, completed or
+deleted is written as an exception row (serie_id + serie_data) which then
+replaces the computed occurrence.
+
+Computed occurrences have string ids of the form "<serie_id>:<YYYY-MM-DD>" so
+the usual /tasks/{id} endpoints can address them.
+"""
+from datetime import date, timedelta
+from types import SimpleNamespace
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+import models
+
+OCCURRENCE_SEPARATOR = ":"
+
+# Columns that describe the series itself and are not copied to single tasks
+SERIES_ONLY_COLUMNS = {"id", "recorrente", "serie_id", "serie_data", "excluida"}
+# Per-row bookkeeping that a copied or derived row must not inherit
+BOOKKEEPING_COLUMNS = {"import_key", "import_hash", "updated_at", "sync_version"}
+# Columns expand_rows reads, selected even when a list asks for fewer fields
+RULE_COLUMNS = (
+    "id", "recorrente", "recorrencia_tipo", "recorrencia_intervalo", "recorrencia_dia_mes",
+    "recorrencia_dias_semana", "recorrencia_inicio", "recorrencia_fim",
+)
+
+
+def occurrence_id(serie_id: int, day: date) -> str:
+    return f"{serie_id}{OCCURRENCE_SEPARATOR}{day.isoformat()}"
+
+
+def parse_task_id(task_id: str):
+    """Split a /tasks/{id} path value into (row id, occurrence date or None).
+
+    Returns None when the value is not a valid task or occurrence id.
+    """
+    try:
+        if OCCURRENCE_SEPARATOR in task_id:
+            row_id, day = task_id.split(OCCURRENCE_SEPARATOR, 1)
+            return int(row_id), date.fromisoformat(day)
+        return int(task_id), None
+    except ValueError:
+        return None
+
+
+def parse_weekdays(value: Optional[str]):
+    # 0=Monday, etc.
+    return {int(d) for d in (value or "").split(',') if d.strip()}
+
+
+def occurrence_dates(rule, start: Optional[date] = None, end: Optional[date] = None):
+    """Dates matched by the recurrence rule between start and end (inclusive).
+
+    `rule` is anything with the recorrencia_* attributes (a series row or a
+    TaskCreate payload). The window is clipped to the series' own range, and
+    all dates are computed at once from a date range and a boolean mask.
+    """
+    first, last = rule.recorrencia_inicio, rule.recorrencia_fim
+    if not rule.recorrencia_tipo or not first or not last:
+        return []
+    lo = max(first, start) if start else first
+    hi = min(last, end) if end else last
+    if lo > hi:
+        return []
+
+    if rule.recorrencia_tipo == 'n_dias' and rule.recorrencia_intervalo and rule.recorrencia_intervalo > 0:
+        # Arithmetic progression from the series start: jump straight to the
+        # first step inside the window instead of masking every day
+        interval = rule.recorrencia_intervalo
+        skip = -(-(lo - first).days // interval) * interval
+        days = pd.date_range(first + timedelta(days=skip), hi, freq=f"{interval}D")
+    elif rule.recorrencia_tipo == 'dia_mes' and rule.recorrencia_dia_mes:
+        days = pd.date_range(lo, hi, freq="D")
+        days = days[days.day == rule.recorrencia_dia_mes]
+    elif rule.recorrencia_tipo == 'dia_semana' and rule.recorrencia_dias_semana:
+        days = pd.date_range(lo, hi, freq="D")
+        days = days[np.isin(days.weekday, list(parse_weekdays(rule.recorrencia_dias_semana)))]
+    else:
+        return []
+    return days.date.tolist()
+
+
+def is_series():
+    return models.Atividade.recorrente.is_(True)
+
+
+def is_visible():
+    """Excludes tombstone rows of deleted occurrences"""
+    return models.Atividade.excluida.isnot(True)
+
+
+def in_window(start: Optional[date], end: Optional[date]):
+    """Rows with `data` in [start, end] plus series whose range overlaps it"""
+    Atividade = models.Atividade
+    single, series = [Atividade.recorrente.isnot(True)], [is_series()]
+    if start:
+        single.append(Atividade.data >= start)
+        series.append(Atividade.recorrencia_fim >= start)
+    if end:
+        single.append(Atividade.data <= end)
+        series.append(Atividade.recorrencia_inicio <= end)
+    return or_(and_(*single), and_(*series))
+
+
+def exception_dates_query(serie_ids):
+    return select(models.Atividade.serie_id, models.Atividade.serie_data).where(
+        models.Atividade.serie_id.in_(serie_ids)
+    )
+
+
+def group_exception_dates(rows):
+    """{serie_id: {dates that already have an exception row}}"""
+    taken = {}
+    for serie_id, day in rows:
+        taken.setdefault(serie_id, set()).add(day)
+    return taken
+
+
+def exception_dates(db: Session, serie_ids):
+    if not serie_ids:
+        return {}
+    return group_exception_dates(db.execute(exception_dates_query(serie_ids)).all())
+
+
+def row_columns(row):
+    """Column names of an ORM row, or of a Core row (only the selected ones)"""
+    if hasattr(row, "_fields"):
+        return row._fields
+    return [c.name for c in row.__table__.columns]
+
+
+def build_occurrences(serie, days):
+    per_day = {"id", "data", "serie_data"}
+    base = {name: getattr(serie, name) for name in row_columns(serie) if name not in per_day}
+    base.update(recorrente=False, serie_id=serie.id, excluida=False)
+    return [
+        SimpleNamespace(**base, id=occurrence_id(serie.id, day), data=day, serie_data=day)
+        for day in days
+    ]
+
+
+def series_ids(rows):
+    return [r.id for r in rows if r.recorrente]
+
+
+def expand_with_exceptions(rows, taken, start: Optional[date] = None, end: Optional[date] = None):
+    expanded = []
+    for row in rows:
+        if not row.recorrente:
+            expanded.append(row)
+            continue
+        skip = taken.get(row.id, set())
+        expanded.extend(build_occurrences(row, [d for d in occurrence_dates(row, start, end) if d not in skip]))
+    return expanded
+
+
+def expand_rows(db: Session, rows, start: Optional[date] = None, end: Optional[date] = None):
+    """Replace series rows by their occurrences in [start, end].
+
+    Dates that have an exception row are skipped: the exception is a stored
+    row and is returned by the caller's query on its own (or not at all when
+    the occurrence was deleted).
+    """
+    ids = series_ids(rows)
+    if not ids:
+        return rows
+    return expand_with_exceptions(rows, exception_dates(db, ids), start, end)
+
+
+async def expand_rows_async(db, rows, start: Optional[date] = None, end: Optional[date] = None):
+    """expand_rows for an AsyncSession"""
+    ids = series_ids(rows)
+    if not ids:
+        return rows
+    result = await db.execute(exception_dates_query(ids))
+    return expand_with_exceptions(rows, group_exception_dates(result.all()), start, end)
+
+
+def single_task_values(row):
+    """Column values of a task or series row, minus the series bookkeeping"""
+    skip = SERIES_ONLY_COLUMNS | BOOKKEEPING_COLUMNS
+    return {c.name: getattr(row, c.name) for c in row.__table__.columns if c.name not in skip}
+
+
+def get_or_create_exception(db: Session, serie, day: date):
+    """Exception row overriding the occurrence of `serie` on `day` (not committed)"""
+    exception = db.query(models.Atividade).filter(
+        models.Atividade.serie_id == serie.id,
+        models.Atividade.serie_data == day
+    ).first()
+    if exception:
+        return exception
+    return new_exception(db, serie, day)
+
+
+def get_or_create_exceptions(db: Session, occurrences):
+    """get_or_create_exception for many (serie, day) pairs with one query for
+    the existing rows. Returns {(serie_id, day): row or None} (not committed)"""
+    if not occurrences:
+        return {}
+    rows = db.query(models.Atividade).filter(
+        models.Atividade.serie_id.in_({serie.id for serie, _ in occurrences})
+    )
+    existing = {(row.serie_id, row.serie_data): row for row in rows}
+    for serie, day in occurrences:
+        if (serie.id, day) not in existing:
+            existing[(serie.id, day)] = new_exception(db, serie, day)
+    return {(serie.id, day): existing[(serie.id, day)] for serie, day in occurrences}
+
+
+def new_exception(db: Session, serie, day: date):
+    """Exception row for a date of the series, or None when `day` is not one of its occurrences"""
+    if day not in occurrence_dates(serie, day, day):
+        return None
+    values = single_task_values(serie)
+    values.update(data=day, serie_id=serie.id, serie_data=day, recorrente=False, excluida=False)
+    exception = models.Atividade(**values)
+    db.add(exception)
+    return exception
@@ -0,0 +1,168 @@
+"""
+Response models for the read endpoints.
+
+The models declare the API shape and decide which columns the list queries
+select (see queries.rows). Lists are read as Core rows with exactly those
+columns, so instead of validating every row again (or walking ORM objects
+with jsonable_encoder) the endpoints hand the rows to orjson directly.
+"""
+from datetime import date, datetime
+from typing import List, Optional, Union
+
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+
+class TaskOut(BaseModel):
+    id: Union[int, str] # "<serie_id>:<YYYY-MM-DD>" for computed occurrences
+    user_id: Optional[int] = None
+    descricao: Optional[str] = None
+    data: Optional[date] = None
+    status: Optional[str] = None
+    prioridade: Optional[str] = None
+    categoria: Optional[str] = None
+    acao: Optional[str] = None
+    o_que: Optional[str] = None
+    como: Optional[str] = None
+    onde: Optional[str] = None
+    cta: Optional[str] = None
+    duracao: Optional[str] = None
+    kpi_meta: Optional[str] = None
+    tipo_dia: Optional[str] = None
+    dia_semana: Optional[str] = None
+    tema_macro: Optional[str] = None
+    angulo: Optional[str] = None
+    canal_area: Optional[str] = None
+    descricao_original: Optional[str] = None
+    recorrencia_tipo: Optional[str] = None
+    recorrencia_intervalo: Optional[int] = None
+    recorrencia_dia_mes: Optional[int] = None
+    recorrencia_dias_semana: Optional[str] = None
+    recorrencia_inicio: Optional[date] = None
+    recorrencia_fim: Optional[date] = None
+    recorrente: Optional[bool] = None
+    serie_id: Optional[int] = None
+    serie_data: Optional[date] = None
+    excluida: Optional[bool] = None
+    updated_at: Optional[datetime] = None
+
+
+class StrategyOut(BaseModel):
+    id: int
+    user_id: Optional[int] = None
+    tema: Optional[str] = None
+    semana_inicio: Optional[date] = None
+    semana_fim: Optional[date] = None
+    descricao_detalhada: Optional[str] = None
+    updated_at: Optional[datetime] = None
+
+
+class InsightOut(BaseModel):
+    id: int
+    user_id: Optional[int] = None
+    descricao: Optional[str] = None
+    data_prevista: Optional[date] = None
+    status: Optional[str] = None
+    category: Optional[str] = None
+    categoria: Optional[str] = None
+    o_que: Optional[str] = None
+    como: Optional[str] = None
+    onde: Optional[str] = None
+    cta: Optional[str] = None
+    duracao: Optional[str] = None
+    kpi_meta: Optional[str] = None
+    tipo_dia: Optional[str] = None
+    dia_semana: Optional[str] = None
+    tema_macro: Optional[str] = None
+    angulo: Optional[str] = None
+    canal_area: Optional[str] = None
+    prioridade: Optional[str] = None
+    updated_at: Optional[datetime] = None
+
+
+class CategoryOut(BaseModel):
+    id: int
+    user_id: Optional[int] = None
+    nome: Optional[str] = None
+    updated_at: Optional[datetime] = None
+
+
+class ActionOut(BaseModel):
+    id: int
+    user_id: Optional[int] = None
+    categoria_id: Optional[int] = None
+    nome: Optional[str] = None
+    updated_at: Optional[datetime] = None
+
+
+class BriefingOut(BaseModel):
+    date: date
+    total_tasks: int
+    tasks: List[TaskOut]
+
+
+class MeOut(BaseModel):
+    id: int
+    email: str
+    role: Optional[str] = None
+
+
+class BootstrapOut(BaseModel):
+    me: MeOut
+    token: str
+    tasks: List[TaskOut]
+    strategies: List[StrategyOut]
+    insights: List[InsightOut]
+    categories: List[CategoryOut]
+    actions: List[ActionOut]
+
+
+class TaskChanges(BaseModel):
+    changed: List[TaskOut]
+    deleted: List[Union[int, str]]
+    series: List[int]
+
+
+class StrategyChanges(BaseModel):
+    changed: List[StrategyOut]
+    deleted: List[int]
+
+
+class InsightChanges(BaseModel):
+    changed: List[InsightOut]
+    deleted: List[int]
+
+
+class CategoryChanges(BaseModel):
+    changed: List[CategoryOut]
+    deleted: List[int]
+
+
+class ActionChanges(BaseModel):
+    changed: List[ActionOut]
+    deleted: List[int]
+
+
+class SyncOut(BaseModel):
+    token: str
+    full: bool
+    tasks: TaskChanges
+    strategies: StrategyChanges
+    insights: InsightChanges
+    categories: CategoryChanges
+    actions: ActionChanges
+
+
+def plain(rows, fields=None):
+    """Core rows or computed occurrences as dicts (only `fields` if given)"""
+    dicts = [row._asdict() if hasattr(row, "_asdict") else vars(row) for row in rows]
+    if fields is None:
+        return dicts
+    return [{name: d[name] for name in fields if name in d} for d in dicts]
+
+
+def render(content, response: Optional[Response] = None):
+    """ORJSONResponse keeping the headers set on the endpoint's injected
+    response (returning a response object directly would drop them)"""
+    return ORJSONResponse(content, headers=dict(response.headers) if response is not None else None)
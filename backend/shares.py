@@ -0,0 +1,95 @@
+"""
+Owners whose plans each user can see.
+
+The task lists used to look up plan_shares by email on every request (as a
+subquery, or a separate query building an id list). The owner ids are now
+resolved once per user and kept in a per-worker TTLCache keyed by email, so
+the list statements filter on literal ids: `user_id IN (...)` over the
+(user_id, ...) indexes, with no join against plan_shares.
+
+Sharing bumps the sharee's users.share_version in the same transaction.
+An entry only counts for versions up to the one it was read at. The
+current user carries the version it was loaded with (auth's user cache),
+and the users query behind the list ETags and /sync reads the current one
+at no extra cost: when it is newer the owners are read again, so every
+worker sees a new share on the sharee's next list or sync request.
+SHARED_OWNERS_CACHE_TTL_SECONDS bounds memory use; 0 disables the cache.
+"""
+import os
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+import models
+from cache import TTLCache
+
+owner_cache = TTLCache(
+    maxsize=int(os.getenv("SHARED_OWNERS_CACHE_MAX_SIZE", "1024")),
+    ttl=float(os.getenv("SHARED_OWNERS_CACHE_TTL_SECONDS", "60")),
+)
+
+def bump(db: Session, *emails):
+    """Call when plans are shared with (or unshared from) these emails (not
+    committed)"""
+    emails = [email for email in emails if email]
+    if emails:
+        User = models.User
+        db.execute(
+            update(User).where(User.email.in_(emails)).values(
+                share_version=func.coalesce(User.share_version, 0) + 1
+            )
+        )
+
+
+def invalidate(*emails):
+    """Drop this worker's entries right away, after the bump is committed"""
+    for email in emails:
+        if email:
+            owner_cache.invalidate(email)
+
+
+def query(email: str):
+    return select(models.PlanShare.owner_id).where(
+        models.PlanShare.shared_with_email == email
+    ).distinct().order_by(models.PlanShare.owner_id)
+
+
+def cached(current_user, seen=None):
+    """(version, owner ids or None when they have to be read). `seen` is a
+    share_version read from the database in this request, if any."""
+    current = max(current_user.share_version or 0, seen or 0)
+    entry = owner_cache.get(current_user.email)
+    if entry is not None and entry[0] >= current:
+        return current, entry[1]
+    return current, None
+
+
+def store(email: str, read_at: int, ids) -> tuple:
+    ids = tuple(ids)
+    owner_cache.set(email, (read_at, ids))
+    return ids
+
+
+def seen_version(current_user, version_rows):
+    """The user's share_version from etags.versions_query rows (None for the
+    admins' totals, which have no per-user row)"""
+    for row in version_rows:
+        if len(row) == 3 and row[0] == current_user.id:
+            return row[2]
+    return None
+
+
+def shared_owner_ids(db: Session, current_user, seen=None) -> tuple:
+    """Ids of the users who shared their plan with current_user (sorted)"""
+    read_at, ids = cached(current_user, seen)
+    if ids is not None:
+        return ids
+    return store(current_user.email, read_at, db.scalars(query(current_user.email)).all())
+
+
+async def shared_owner_ids_async(db, current_user, seen=None) -> tuple:
+    read_at, ids = cached(current_user, seen)
+    if ids is not None:
+        return ids
+    result = await db.execute(query(current_user.email))
+    return store(current_user.email, read_at, result.scalars().all())
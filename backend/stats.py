@@ -0,0 +1,84 @@
+"""
+Per-user totals for GET /admin/stats and verify_counts.py.
+
+Users are read a page at a time (by id, like the lists) and each table is
+counted with one GROUP BY user_id over that page, so a page costs the same
+six queries whether the database has ten users or ten thousand.
+"""
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+import models
+import recurrence
+
+# (key in the output, model): counted rows and their latest updated_at
+COUNTED = (
+    ("insights", models.Insight),
+    ("strategies", models.Estrategia),
+    ("categories", models.Categoria),
+)
+
+
+def users():
+    """The rows user_stats() takes; page them with queries.keyset on User.id"""
+    User = models.User
+    return select(User.id, User.email, User.role)
+
+
+def task_counts(user_ids):
+    """(user_id, status, count, latest updated_at) of the stored tasks"""
+    Atividade = models.Atividade
+    return select(
+        Atividade.user_id, Atividade.status, func.count(), func.max(Atividade.updated_at)
+    ).where(
+        Atividade.user_id.in_(user_ids), recurrence.is_visible()
+    ).group_by(Atividade.user_id, Atividade.status)
+
+
+def row_counts(model, user_ids):
+    return select(
+        model.user_id, func.count(), func.max(model.updated_at)
+    ).where(model.user_id.in_(user_ids)).group_by(model.user_id)
+
+
+def share_counts(user_ids):
+    """Plans each user shared with others"""
+    PlanShare = models.PlanShare
+    return select(PlanShare.owner_id, func.count()).where(
+        PlanShare.owner_id.in_(user_ids)
+    ).group_by(PlanShare.owner_id)
+
+
+def latest(*values):
+    values = [v for v in values if v is not None]
+    return max(values) if values else None
+
+
+def user_stats(db: Session, users):
+    """One dict per (id, email, role) row, in the same order"""
+    stats = {
+        user.id: {
+            "id": user.id, "email": user.email, "role": user.role,
+            "tasks": {"total": 0, "status": {}},
+            **{key: 0 for key, _ in COUNTED},
+            "shares": 0,
+            "last_activity": None,
+        }
+        for user in users
+    }
+    ids = list(stats)
+    if not ids:
+        return []
+
+    for user_id, status, count, updated_at in db.execute(task_counts(ids)):
+        tasks = stats[user_id]["tasks"]
+        tasks["total"] += count
+        tasks["status"][status or ""] = count
+        stats[user_id]["last_activity"] = latest(stats[user_id]["last_activity"], updated_at)
+    for key, model in COUNTED:
+        for user_id, count, updated_at in db.execute(row_counts(model, ids)):
+            stats[user_id][key] = count
+            stats[user_id]["last_activity"] = latest(stats[user_id]["last_activity"], updated_at)
+    for user_id, count in db.execute(share_counts(ids)):
+        stats[user_id]["shares"] = count
+    return list(stats.values())
@@ -0,0 +1,240 @@
+"""
+Delta sync for GET /sync.
+
+Rows of every synced table, and the tombstones that deletes leave in
+sync_tombstones, carry a sync_version: the owner's data_version from the
+transaction that last wrote them. etags.bump holds the owner's row lock
+until commit, so those versions follow commit order, and stamp_rows applies
+them at commit (writes leave the column NULL). A sync token records the
+version of each owner it covered, so the next sync downloads exactly the
+rows committed after it, however long the writing transaction ran.
+
+A full snapshot is returned instead of a delta when there is no token, when
+it predates the tombstone retention, or when the user sees an owner the
+token does not cover or stops seeing one (a plan was shared with them or
+unshared since then: the owner's existing rows are new to them but not
+"changed", and unsharing leaves no tombstones).
+
+Everyone, admins included, syncs their own rows plus the tasks of plans
+shared with them, so the snapshot is bounded by one plan rather than by the
+number of tenants.
+
+Tasks follow the /tasks rules: series rows are expanded to their
+occurrences. `series` lists series whose computed occurrences the client
+must drop before applying `changed` (the series was edited or deleted).
+"""
+import base64
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, case, event, false, func, or_, select, update
+from sqlalchemy.orm import Session
+
+import etags
+import models
+import queries
+import recurrence
+import schemas
+import shares
+
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("SYNC_TOMBSTONE_RETENTION_DAYS", "30"))
+
+# Tombstone entity names
+TASK, SERIES, STRATEGY, INSIGHT, CATEGORY, ACTION = "task", "series", "strategy", "insight", "category", "action"
+
+
+def utcnow():
+    return datetime.utcnow()
+
+
+SYNCED = (models.Atividade, models.Estrategia, models.Insight, models.Categoria, models.Acao, models.SyncTombstone)
+
+
+@event.listens_for(Session, "before_commit")
+def stamp_rows(session):
+    """Stamp the rows this transaction wrote with their owners' bumped versions"""
+    versions = session.info.get(etags.BUMPED)
+    if not versions:
+        return
+    session.flush()
+    for model in SYNCED:
+        table = model.__table__
+        stmt = update(table).where(
+            table.c.user_id.in_(versions), table.c.sync_version.is_(None)
+        ).values(sync_version=case(versions, value=table.c.user_id))
+        if 'updated_at' in table.c:
+            stmt = stmt.values(updated_at=table.c.updated_at)
+        session.execute(stmt)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def forget_bumps(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(etags.BUMPED, None)
+
+
+def record_deletions(db: Session, entity: str, user_id, ids):
+    """Add tombstones for deleted rows of `user_id` (not committed)"""
+    now = utcnow()
+    db.add_all(
+        models.SyncTombstone(entity=entity, entity_id=str(i), user_id=user_id, deleted_at=now)
+        for i in ids
+    )
+
+
+def prune_tombstones(db: Session):
+    cutoff = utcnow() - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+    db.query(models.SyncTombstone).filter(models.SyncTombstone.deleted_at < cutoff).delete(synchronize_session=False)
+    db.commit()
+
+
+def make_token(issued: datetime, versions):
+    raw = json.dumps({"t": issued.isoformat(), "v": versions}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def parse_token(token: Optional[str]):
+    """(issue time, {owner id: version}), or None for a full snapshot"""
+    if not token:
+        return None
+    try:
+        datetime.fromisoformat(token)
+        return None # issued before sync_version
+    except ValueError:
+        pass
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token))
+        return datetime.fromisoformat(data["t"]), {int(k): int(v) for k, v in data["v"].items()}
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+
+
+def owner_ids(db: Session, current_user):
+    """Users whose tasks the user syncs: their own and shared plans. Admins
+    too: every user's rows would make the snapshot grow with the tenant
+    count, so the app loads their all-users view from the paged lists."""
+    return [current_user.id, *shares.shared_owner_ids(db, current_user)]
+
+
+def owner_versions(owners):
+    """(id, data_version, share_version) of the owners"""
+    User = models.User
+    return select(User.id, func.coalesce(User.data_version, 0), User.share_version).where(User.id.in_(owners))
+
+
+def needs_full(token, versions):
+    if token is None:
+        return True
+    issued, covered = token
+    return issued < utcnow() - timedelta(days=TOMBSTONE_RETENTION_DAYS) or versions.keys() != covered.keys()
+
+
+def visible(model, owners, since):
+    """Rows of `owners` committed after `since`, the token's versions (None:
+    all rows)"""
+    if since is None:
+        return [model.user_id.in_(owners)]
+    return [or_(false(), *(
+        and_(model.user_id == owner, model.sync_version > since[owner])
+        for owner in owners if owner in since
+    ))]
+
+
+# Rows are read as Core tuples with the columns of the response model
+OUTPUT = {
+    models.Atividade: schemas.TaskOut,
+    models.Estrategia: schemas.StrategyOut,
+    models.Insight: schemas.InsightOut,
+    models.Categoria: schemas.CategoryOut,
+    models.Acao: schemas.ActionOut,
+}
+
+
+def changed_rows(db: Session, model, owners, since, *criteria):
+    stmt = queries.rows(model, OUTPUT[model]).where(*criteria, *visible(model, owners, since))
+    # Newest first, like the list endpoints
+    return db.execute(stmt.order_by(model.id.desc())).all()
+
+
+def tombstones(db: Session, owners, since, *entities):
+    Tombstone = models.SyncTombstone
+    stmt = select(Tombstone.entity, Tombstone.entity_id).where(
+        Tombstone.entity.in_(entities), *visible(Tombstone, owners, since)
+    )
+    return db.execute(stmt).all()
+
+
+def task_changes(db: Session, owners, since):
+    Atividade = models.Atividade
+    if since is None:
+        rows = changed_rows(db, Atividade, owners, None, recurrence.is_visible())
+        return {"changed": schemas.plain(recurrence.expand_rows(db, rows)), "deleted": [], "series": []}
+
+    rows = changed_rows(db, Atividade, owners, since)
+    changed, deleted, series = [], [], []
+    for row in rows:
+        if row.recorrente:
+            series.append(row.id)
+        elif row.serie_id is not None:
+            # The exception row replaces the computed occurrence of that date
+            deleted.append(recurrence.occurrence_id(row.serie_id, row.serie_data))
+        if row.excluida:
+            deleted.append(row.id)
+        else:
+            changed.append(row)
+    for entity, entity_id in tombstones(db, owners, since, TASK, SERIES):
+        (series if entity == SERIES else deleted).append(int(entity_id))
+    return {"changed": schemas.plain(recurrence.expand_rows(db, changed)), "deleted": deleted, "series": series}
+
+
+def collection_changes(db: Session, model, entity, owners, since):
+    changed = changed_rows(db, model, owners, since)
+    deleted = [] if since is None else [int(i) for _, i in tombstones(db, owners, since, entity)]
+    return {"changed": schemas.plain(changed), "deleted": deleted}
+
+
+COLLECTIONS = ("tasks", "strategies", "insights", "categories", "actions")
+
+
+def snapshot_isolation(db: Session):
+    """Read the collections from one consistent snapshot where supported.
+
+    Ends the session's current (read-only) transaction, e.g. the user lookup.
+    """
+    if db.get_bind().dialect.name == 'postgresql':
+        db.rollback()
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+
+def sync(db: Session, current_user, token: Optional[str]):
+    """Changes visible to the user since `token`, plus the next token"""
+    snapshot_isolation(db)
+    issued = utcnow()
+    token = parse_token(token)
+    # Read in the same snapshot as the rows: everything stamped up to these
+    # versions is in this response, everything after lands in the next one
+    task_owners = owner_ids(db, current_user)
+    rows = db.execute(owner_versions(task_owners)).all()
+    # A plan shared since the cached owners were read: read them again
+    current = [current_user.id, *shares.shared_owner_ids(db, current_user, shares.seen_version(current_user, rows))]
+    if current != task_owners:
+        task_owners = current
+        rows = db.execute(owner_versions(task_owners)).all()
+    versions = {owner: version for owner, version, _ in rows}
+    full = needs_full(token, versions)
+    since = None if full else token[1]
+
+    # Tasks include shared plans, the rest are the user's own
+    own = [current_user.id]
+    return {
+        "token": make_token(issued, versions),
+        "full": full,
+        "tasks": task_changes(db, task_owners, since),
+        "strategies": collection_changes(db, models.Estrategia, STRATEGY, own, since),
+        "insights": collection_changes(db, models.Insight, INSIGHT, own, since),
+        "categories": collection_changes(db, models.Categoria, CATEGORY, own, since),
+        "actions": collection_changes(db, models.Acao, ACTION, own, since),
+    }
@@ -0,0 +1,171 @@
+"""
+Moving or copying a user's whole plan to another user, for
+POST /admin/users/{id}/transfer and transfer_data.py.
+
+Everything runs in one transaction with one statement per table. A move is
+an UPDATE ... WHERE user_id = :source, plus tombstones written with INSERT
+... SELECT so the source's clients drop the rows at their next /sync. The
+target's clients pick them up through the sync_version stamped at commit.
+
+A copy is an INSERT ... SELECT per table. The copies get id + offset (past
+the table's current max id), so references inside the plan are remapped in
+the same statement: exception rows to their series and actions to their
+category. On Postgres the table is locked against concurrent inserts until
+commit, and the id sequence is moved past the new rows.
+
+Moved and copied rows lose their spreadsheet import keys. Tasks the target
+already has on the same day (duplicates.existing) are not copied twice, and
+a move flags them as copies so the dedup keeps both.
+"""
+from sqlalchemy import String, case, cast, delete, func, insert, literal, null, select, text, update
+from sqlalchemy.orm import Session
+
+import duplicates
+import etags
+import models
+import shares
+import sync
+
+# Plan tables with a user_id column and the /sync entity of their rows
+PLAN_TABLES = (
+    (models.Atividade, sync.TASK),
+    (models.Estrategia, sync.STRATEGY),
+    (models.Insight, sync.INSIGHT),
+    (models.Categoria, sync.CATEGORY),
+    (models.Acao, sync.ACTION),
+)
+
+
+def entity_of(model, entity):
+    """Tombstone entity of each row (series rows have their own)"""
+    if model is models.Atividade:
+        return case((model.recorrente.is_(True), literal(sync.SERIES)), else_=literal(sync.TASK))
+    return literal(entity)
+
+
+def unkeyed(table):
+    """Drop the spreadsheet keys: the rows came from the source's workbook, and
+    the target's next import must neither adopt nor delete them"""
+    return {name: None for name in ("import_key", "import_hash") if name in table.c}
+
+
+def move(db: Session, source_id: int, target_id: int, now):
+    counts = {}
+    # Tasks the target already has that day: flag them as copies rather than
+    # leave them for the dedup to delete
+    table = models.Atividade.__table__
+    counts["duplicates"] = db.execute(
+        update(table).where(table.c.user_id == source_id, duplicates.existing_in(target_id, table)).values(
+            copia=True, content_hash=None
+        )
+    ).rowcount
+    for model, entity in PLAN_TABLES:
+        table = model.__table__
+        db.execute(insert(models.SyncTombstone).from_select(
+            ["entity", "entity_id", "user_id", "deleted_at"],
+            select(entity_of(model, entity), cast(table.c.id, String), table.c.user_id, literal(now)).where(
+                table.c.user_id == source_id
+            ),
+        ))
+        counts[table.name] = db.execute(
+            update(table).where(table.c.user_id == source_id).values(user_id=target_id, updated_at=now, **unkeyed(table))
+        ).rowcount
+
+    # Shares: readers of the source's plan now read the target's. Drop the
+    # ones the target already has or that would share the plan with its owner.
+    PlanShare = models.PlanShare
+    target_email = db.scalar(select(models.User.email).where(models.User.id == target_id))
+    readers = db.scalars(select(PlanShare.shared_with_email).where(PlanShare.owner_id == source_id)).all()
+    db.execute(delete(PlanShare).where(
+        PlanShare.owner_id == source_id,
+        (PlanShare.shared_with_email == target_email) | PlanShare.shared_with_email.in_(
+            select(PlanShare.shared_with_email).where(PlanShare.owner_id == target_id).scalar_subquery()
+        ),
+    ))
+    counts[PlanShare.__tablename__] = db.execute(
+        update(PlanShare).where(PlanShare.owner_id == source_id).values(owner_id=target_id)
+    ).rowcount
+    return counts, readers
+
+
+def reserve_ids(db: Session, table, source_id: int):
+    """Offset that puts the copies of the source's rows past the table's max id"""
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text(f"LOCK TABLE {table.name} IN SHARE ROW EXCLUSIVE MODE"))
+    max_id, min_source_id = db.execute(
+        select(func.max(table.c.id), select(func.min(table.c.id)).where(table.c.user_id == source_id).scalar_subquery())
+    ).one()
+    if min_source_id is None:
+        return None
+    return max_id + 1 - min_source_id
+
+
+def advance_sequence(db: Session, table):
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), (SELECT max(id) FROM {table.name}))"
+        ))
+
+
+def copy(db: Session, source_id: int, target_id: int, now):
+    counts = {"duplicates": 0}
+    offsets = {}
+    for model, _ in PLAN_TABLES:
+        table = model.__table__
+        offsets[table.name] = offset = reserve_ids(db, table, source_id)
+        if offset is None:
+            counts[table.name] = 0
+            continue
+        values = {c.name: c for c in table.c}
+        # sync_version stays NULL so the commit stamps the copies with the target's version
+        values.update(id=table.c.id + offset, user_id=literal(target_id), updated_at=literal(now), sync_version=null())
+        values.update(unkeyed(table))
+        source_rows = [table.c.user_id == source_id]
+        if model is models.Atividade:
+            # Exception rows point at the copy of their series
+            values["serie_id"] = table.c.serie_id + offset
+            # Tasks the target already has that day are not copied again
+            duplicate = duplicates.existing_in(target_id, table)
+            counts["duplicates"] = db.scalar(select(func.count()).where(*source_rows, duplicate))
+            source_rows.append(~duplicate)
+        elif model is models.Acao:
+            category_offset = offsets[models.Categoria.__tablename__]
+            if category_offset is not None:
+                values["categoria_id"] = table.c.categoria_id + category_offset
+        names = list(values)
+        counts[table.name] = db.execute(insert(table).from_select(
+            names, select(*[values[name] for name in names]).where(*source_rows)
+        )).rowcount
+        advance_sequence(db, table)
+    return counts
+
+
+def transfer_plan(db: Session, source_id: int, target_id: int, mode: str = "move"):
+    """Move (or copy) every plan row of source_id to target_id and commit.
+    Returns {table: rows, "duplicates": tasks the target already had that
+    day, skipped by a copy and flagged as copies by a move}. Raises LookupError for an unknown user and
+    ValueError for a bad mode or the same user twice."""
+    if mode not in ("move", "copy"):
+        raise ValueError(f"Unknown mode: {mode}")
+    if source_id == target_id:
+        raise ValueError("Source and target are the same user")
+    found = set(db.scalars(select(models.User.id).where(models.User.id.in_([source_id, target_id]))).all())
+    if found != {source_id, target_id}:
+        raise LookupError(f"User not found: {', '.join(str(i) for i in sorted({source_id, target_id} - found))}")
+
+    now = sync.utcnow()
+    readers = []
+    try:
+        if mode == "copy":
+            counts = copy(db, source_id, target_id, now)
+        else:
+            counts, readers = move(db, source_id, target_id, now)
+        etags.bump(db, source_id, target_id)
+        shares.bump(db, *readers)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    # Their shared owners changed from the source to the target
+    shares.invalidate(*readers)
+    return counts
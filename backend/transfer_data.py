@@ -1,54 +1,51 @@
-from sqlalchemy.orm import Session
-from database import SessionLocal, engine
-import models
+"""
+Move (or copy) a user's whole plan to another user; same transfer as
+POST /admin/users/{id}/transfer.
+
+    python transfer_data.py SOURCE TARGET [--copy]
+
+SOURCE and TARGET are user ids or emails.
+"""
+import argparse
 import traceback
 
-# Ensure tables exist
-models.Base.metadata.create_all(bind=engine)
+from sqlalchemy import select
+
+from database import SessionLocal
+import models
+import transfer
 
-def transfer_data():
+
+def resolve_user(db, value):
+    User = models.User
+    column = User.id if value.isdigit() else User.email
+    user = db.execute(select(User.id, User.email).where(column == (int(value) if value.isdigit() else value))).first()
+    if user is None:
+        raise LookupError(f"User not found: {value}")
+    return user
+
+
+def transfer_data(source, target, mode):
     db = SessionLocal()
     try:
-        source_id = 1 # Admin
-        target_id = 2 # pdonassolo@gmail.com
-        
-        # Verify users exist
-        source = db.query(models.User).filter(models.User.id == source_id).first()
-        target = db.query(models.User).filter(models.User.id == target_id).first()
-        
-        if not source or not target:
-            print(f"Error: Users not found. Source: {source}, Target: {target}")
-            return
-
-        print(f"Transferring data from {source.email} (ID {source.id}) to {target.email} (ID {target.id})")
-        
-        # Update Activities
-        tasks = db.query(models.Atividade).filter(models.Atividade.user_id == source_id).all()
-        print(f"Found {len(tasks)} tasks to transfer.")
-        for t in tasks:
-            t.user_id = target_id
-            
-        # Update Strategies
-        strats = db.query(models.Estrategia).filter(models.Estrategia.user_id == source_id).all()
-        print(f"Found {len(strats)} strategies to transfer.")
-        for s in strats:
-            s.user_id = target_id
-
-        # Update Insights
-        insights = db.query(models.Insight).filter(models.Insight.user_id == source_id).all()
-        print(f"Found {len(insights)} insights to transfer.")
-        for i in insights:
-            i.user_id = target_id
-            
-        db.commit()
+        source, target = resolve_user(db, source), resolve_user(db, target)
+        print(f"{mode.capitalize()} data from {source.email} (ID {source.id}) to {target.email} (ID {target.id})")
+        counts = transfer.transfer_plan(db, source.id, target.id, mode)
+        for table, rows in counts.items():
+            print(f"{table}: {rows} rows")
         print("Transfer complete successfully!")
-        
+    except (LookupError, ValueError) as e:
+        print(f"Error: {e}")
     except Exception as e:
         print(f"Error: {e}")
         traceback.print_exc()
-        db.rollback()
     finally:
         db.close()
 
 if __name__ == "__main__":
-    transfer_data()
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("source", help="user id or email whose plan is transferred")
+    parser.add_argument("target", help="user id or email receiving it")
+    parser.add_argument("--copy", action="store_true", help="copy the plan instead of moving it")
+    args = parser.parse_args()
+    transfer_data(args.source, args.target, "copy" if args.copy else "move")
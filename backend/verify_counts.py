@@ -1,6 +1,8 @@
 from sqlalchemy.orm import Session
 from database import SessionLocal, engine
 import models
+import queries
+import stats
 import traceback
 
 # Ensure tables exist
@@ -15,9 +17,21 @@ def count_data():
         user_count = db.query(models.User).count()
         
         print(f"--- USER DATA ---")
-        for user in db.query(models.User).all():
-            count = db.query(models.Atividade).filter(models.Atividade.user_id == user.id).count()
-            print(f"User ID: {user.id} | Email: {user.email} | Role: {user.role} | Tasks: {count}")
+        # Same GROUP BY queries as GET /admin/stats, one page of users at a time
+        after_id = None
+        while True:
+            users = db.execute(queries.keyset(stats.users(), models.User.id, after_id, queries.MAX_PAGE_SIZE)).all()
+            for row in stats.user_stats(db, users[:queries.MAX_PAGE_SIZE]):
+                print(
+                    f"User ID: {row['id']} | Email: {row['email']} | Role: {row['role']} | "
+                    f"Tasks: {row['tasks']['total']} {row['tasks']['status']} | Insights: {row['insights']} | "
+                    f"Strategies: {row['strategies']} | Categories: {row['categories']} | "
+                    f"Shares: {row['shares']} | Last activity: {row['last_activity']}"
+                )
+            if len(users) <= queries.MAX_PAGE_SIZE:
+                break
+            after_id = users[queries.MAX_PAGE_SIZE - 1].id
+        print(f"Users: {user_count} | Tasks: {task_count} | Strategies: {strategy_count} | Insights: {insight_count}")
         print(f"-----------------")
             
         print(f"--- RAW TASK DATA ---")
@@ -0,0 +1,116 @@
+"""
+Check that the planner uses the hot-path indexes.
+
+Runs EXPLAIN for the query shapes of /tasks, /insights, /briefing/today,
+/export, the shares lookup and the weekly strategies against DATABASE_URL
+(SQLite by default, Postgres when set) and fails if an expected index is
+not in the plan, or if a page has to sort its rows (SQLite's temp B-tree,
+a Sort node on Postgres) instead of reading them in index order.
+
+    python verify_indexes.py
+    DATABASE_URL=postgresql://... python verify_indexes.py
+"""
+import sys
+from datetime import date
+
+from sqlalchemy import select, text
+
+from database import engine
+import models
+import queries
+from auth import CurrentUser
+
+# Ensure tables and indexes exist
+models.Base.metadata.create_all(bind=engine)
+for table in models.Base.metadata.sorted_tables:
+    for index in table.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+Atividade, Insight, PlanShare, Estrategia = models.Atividade, models.Insight, models.PlanShare, models.Estrategia
+TODAY = date(2026, 2, 2)
+USER = CurrentUser(id=1, email="someone@example.com", role="user")
+
+CHECKS = [
+    (
+        "briefing/today",
+        select(Atividade).where(Atividade.user_id == 1, Atividade.data == TODAY, Atividade.status != "Feito"),
+        # Either (user_id, data, ...) index; SQLite picks by creation order
+        "ix_atividades_user_id_data_",
+    ),
+    (
+        "tasks page (own)",
+        queries.task_page(USER, (), 5000, 100),
+        "ix_atividades_user_id_id",
+    ),
+    (
+        "tasks page (own + shared plans)",
+        queries.task_page(USER, (2, 3), 5000, 100),
+        "ix_atividades_user_id_id",
+    ),
+    (
+        "tasks page (filtered, own + shared plans)",
+        queries.task_page(USER, (2, 3), 5000, 100, filters={"status": ["A fazer"], "prioridade": ["Alta"]}),
+        "ix_atividades_user_id_id",
+    ),
+    (
+        "duplicate check (POST /tasks)",
+        select(Atividade.id).where(Atividade.user_id == 1, Atividade.data == TODAY, Atividade.content_hash == "0" * 40).limit(1),
+        "ix_atividades_user_id_data_content_hash",
+    ),
+    (
+        "export (own)",
+        select(Atividade.id, Atividade.descricao, Atividade.data).where(Atividade.user_id == 1),
+        "ix_atividades_user_id_",
+    ),
+    (
+        "insights page",
+        select(Insight).where(Insight.user_id == 1).order_by(Insight.id.desc()).limit(100),
+        "ix_insights_user_id_id",
+    ),
+    (
+        "shares with me",
+        select(PlanShare.owner_id).where(PlanShare.shared_with_email == "someone@example.com"),
+        "ix_plan_shares_shared_with_email",
+    ),
+    (
+        "weekly strategies",
+        select(Estrategia).where(Estrategia.user_id == 1, Estrategia.semana_inicio >= TODAY),
+        "ix_estrategia_user_id_semana_inicio",
+    ),
+]
+
+
+def explain(conn, stmt):
+    sql = str(stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    if engine.dialect.name == "sqlite":
+        rows = conn.execute(text("EXPLAIN QUERY PLAN " + sql)).fetchall()
+        return "\n".join(str(r[-1]) for r in rows)
+    rows = conn.execute(text("EXPLAIN " + sql)).fetchall()
+    return "\n".join(r[0] for r in rows)
+
+
+def sorts(name, plan):
+    """Whether a page sorts instead of reading the index in order"""
+    if not name.endswith("page") and "page (" not in name:
+        return False
+    return "TEMP B-TREE" in plan.upper() or any(line.strip().startswith("Sort") for line in plan.split("->"))
+
+
+def verify_indexes():
+    failures = 0
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            # Small/empty tables would otherwise always be seq-scanned
+            conn.execute(text("SET enable_seqscan = off"))
+        for name, stmt, expected in CHECKS:
+            plan = explain(conn, stmt)
+            ok = expected in plan and not sorts(name, plan)
+            failures += 0 if ok else 1
+            print(f"[{'OK' if ok else 'FAIL'}] {name}: expects {expected}")
+            print("    " + plan.replace("\n", "\n    "))
+    print(f"{len(CHECKS) - failures}/{len(CHECKS)} query shapes use the expected index ({engine.dialect.name})")
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if verify_indexes() else 0)
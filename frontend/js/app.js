@@ -11,7 +11,9 @@ const app = {
         isRegisterMode: false,
         accessToken: null,
         categories: [],
-        actions: []
+        actions: [],
+        syncToken: null,
+        isAdmin: false
     },
 
     init: () => {
@@ -178,56 +180,47 @@ const app = {
 
         try {
             const headers = { 'Authorization': `Bearer ${app.state.accessToken}` };
-            const [tasksRes, strategiesRes, insightsRes, categoriesRes, actionsRes] = await Promise.all([
-                fetch(`${API_URL}/tasks`, { headers }),
-                fetch(`${API_URL}/strategies`, { headers }),
-                fetch(`${API_URL}/insights`, { headers }),
-                fetch(`${API_URL}/categories`, { headers }),
-                fetch(`${API_URL}/actions`, { headers })
-            ]);
-
-            if (!tasksRes.ok || !strategiesRes.ok || !insightsRes.ok || !categoriesRes.ok || !actionsRes.ok) {
-                if (tasksRes.status === 401) {
+            // Admins see every user's tasks, strategies and insights, which /sync
+            // doesn't carry (it covers one plan plus shares): reload the paged lists
+            if (app.state.isAdmin) {
+                await app.loadAllUsersData(headers);
+                app.renderData();
+                return;
+            }
+            // First load: everything in one request; afterwards only what changed
+            const firstLoad = !app.state.syncToken;
+            const res = firstLoad
+                ? await fetch(`${API_URL}/bootstrap`, { headers })
+                : await fetch(`${API_URL}/sync?since=${encodeURIComponent(app.state.syncToken)}`, { headers });
+
+            if (!res.ok) {
+                if (res.status === 401) {
                     app.logout();
                     return;
                 }
                 throw new Error("Falha na resposta da API");
             }
 
-            app.state.tasks = await tasksRes.json();
-            app.state.strategies = await strategiesRes.json();
-            app.state.insights = await insightsRes.json();
-            app.state.categories = await categoriesRes.json();
-            app.state.actions = await actionsRes.json();
-
-            if (!Array.isArray(app.state.tasks)) app.state.tasks = [];
-            if (!Array.isArray(app.state.categories)) app.state.categories = [];
-            if (!Array.isArray(app.state.actions)) app.state.actions = [];
-
-            // Normalize task status
-            app.state.tasks.forEach(t => {
-                if (t.status === 'Pendente') t.status = 'A fazer';
-                if (t.status === 'Concluído') t.status = 'Feito';
-            });
-
-            app.populateWeeks();
-            if (app.state.view === 'table') app.renderTable();
-            else if (app.state.view === 'categories') app.renderCategories();
-            else app.renderTasks();
-
-            app.renderInsights();
-
-            // Admin check
-            try {
-                const meRes = await fetch(`${API_URL}/auth/me`, { headers });
-                if (meRes.ok) {
-                    const me = await meRes.json();
-                    if (me.role === 'admin') {
-                        const adminBtn = document.getElementById('btn-admin-view');
-                        if (adminBtn) adminBtn.classList.remove('hidden');
-                    }
+            const payload = await res.json();
+            if (firstLoad) {
+                app.state.tasks = payload.tasks;
+                app.state.strategies = payload.strategies;
+                app.state.insights = payload.insights;
+                app.state.categories = payload.categories;
+                app.state.actions = payload.actions;
+                app.state.syncToken = payload.token;
+
+                if (payload.me.role === 'admin') {
+                    const adminBtn = document.getElementById('btn-admin-view');
+                    if (adminBtn) adminBtn.classList.remove('hidden');
+                    app.state.isAdmin = true;
+                    await app.loadAllUsersData(headers);
                 }
-            } catch (e) { }
+            } else {
+                app.applySync(payload);
+            }
+
+            app.renderData();
 
         } catch (error) {
             console.error(error);
@@ -235,6 +228,77 @@ const app = {
         }
     },
 
+    // Every page of a list endpoint (newest first), following X-Next-Cursor
+    fetchAllPages: async (path, headers) => {
+        let items = [];
+        let cursor = null;
+        do {
+            const sep = path.includes('?') ? '&' : '?';
+            const url = `${API_URL}${path}${sep}limit=1000${cursor ? `&cursor=${encodeURIComponent(cursor)}` : ''}`;
+            const res = await fetch(url, { headers });
+            if (!res.ok) {
+                if (res.status === 401) app.logout();
+                throw new Error("Falha na resposta da API");
+            }
+            items = items.concat(await res.json());
+            cursor = res.headers.get('X-Next-Cursor');
+        } while (cursor);
+        return items;
+    },
+
+    loadAllUsersData: async (headers) => {
+        const [tasks, strategies, insights, categories, actions] = await Promise.all([
+            app.fetchAllPages('/tasks', headers),
+            app.fetchAllPages('/strategies', headers),
+            app.fetchAllPages('/insights', headers),
+            fetch(`${API_URL}/categories`, { headers }).then(r => r.json()),
+            fetch(`${API_URL}/actions`, { headers }).then(r => r.json())
+        ]);
+        Object.assign(app.state, { tasks, strategies, insights, categories, actions });
+    },
+
+    renderData: () => {
+        if (!Array.isArray(app.state.tasks)) app.state.tasks = [];
+        if (!Array.isArray(app.state.categories)) app.state.categories = [];
+        if (!Array.isArray(app.state.actions)) app.state.actions = [];
+
+        // Normalize task status
+        app.state.tasks.forEach(t => {
+            if (t.status === 'Pendente') t.status = 'A fazer';
+            if (t.status === 'Concluído') t.status = 'Feito';
+        });
+
+        app.populateWeeks();
+        if (app.state.view === 'table') app.renderTable();
+        else if (app.state.view === 'categories') app.renderCategories();
+        else app.renderTasks();
+
+        app.renderInsights();
+    },
+
+    applySync: (changes) => {
+        const merge = (list, delta, series = []) => {
+            const deleted = new Set(delta.deleted.map(String));
+            const replacedSeries = new Set(series);
+            // Computed occurrences (string ids) of edited/deleted series are re-sent in full
+            const kept = changes.full ? [] : (list || []).filter(item =>
+                !deleted.has(String(item.id)) &&
+                !(typeof item.id === 'string' && replacedSeries.has(item.serie_id))
+            );
+            const byId = new Map(kept.map(item => [String(item.id), item]));
+            delta.changed.forEach(item => byId.set(String(item.id), item));
+            // Newest first like the server's lists (occurrence ids start with their series id)
+            return Array.from(byId.values()).sort((a, b) => parseInt(b.id, 10) - parseInt(a.id, 10));
+        };
+
+        app.state.tasks = merge(app.state.tasks, changes.tasks, changes.tasks.series);
+        app.state.strategies = merge(app.state.strategies, changes.strategies);
+        app.state.insights = merge(app.state.insights, changes.insights);
+        app.state.categories = merge(app.state.categories, changes.categories);
+        app.state.actions = merge(app.state.actions, changes.actions);
+        app.state.syncToken = changes.token;
+    },
+
     /* --- ADMIN --- */
     renderAdmin: async () => {
         const tbody = document.getElementById('users-table-body');
@@ -620,7 +684,9 @@ const app = {
     },
 
     /* --- MODAL --- */
-    openTaskModal: (item = null, mode = 'task') => {
+    openTaskModal: async (item = null, mode = 'task') => {
+        // Lists may only carry the card fields; load the full row for the form
+        if (item) item = await app.fetchDetail(item, mode);
         app.state.modalMode = mode;
         const modal = document.getElementById('task-modal');
         const title = document.getElementById('task-modal-title');
@@ -757,6 +823,19 @@ const app = {
         }
     },
 
+    fetchDetail: async (item, mode) => {
+        const path = mode === 'insight' ? 'insights' : 'tasks';
+        try {
+            const res = await fetch(`${API_URL}/${path}/${encodeURIComponent(item.id)}`, {
+                headers: { 'Authorization': `Bearer ${app.state.accessToken}` }
+            });
+            if (res.ok) return await res.json();
+        } catch (e) {
+            console.error(e);
+        }
+        return item;
+    },
+
     closeTaskModal: () => {
         const modal = document.getElementById('task-modal');
         if (modal) modal.classList.add('hidden');
@@ -957,7 +1036,21 @@ const app = {
             headers: { 'Authorization': `Bearer ${app.state.accessToken}` },
             body: formData
         });
-        if (res.ok) { app.loadData(); app.closeImportModal(); }
+        if (!res.ok) { alert('Erro ao enviar o arquivo.'); return; }
+        app.closeImportModal();
+
+        // The import runs in the background; poll the job until it finishes
+        const { job_id } = await res.json();
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            const jobRes = await fetch(`${API_URL}/import/jobs/${job_id}`, {
+                headers: { 'Authorization': `Bearer ${app.state.accessToken}` }
+            });
+            if (!jobRes.ok) return;
+            const job = await jobRes.json();
+            if (job.status === 'done') { app.loadData(); return; }
+            if (job.status === 'failed') { alert(job.error || 'Erro na importação.'); return; }
+        }
     },
 
     checkAndShowBriefing: async () => {